@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+
+import unittest
+import sys
+import os
+import time
+
+sys.path.append('../util')
+from iwd import IWD
+from hostapd import HostapdCLI
+from benchmark import Benchmark
+
+class Test(unittest.TestCase):
+    def connect(self, device, ssid):
+        '''
+            Connects to 'ssid' and returns the time until the station was
+            connected and until hostapd reported the station as connected
+        '''
+        hapd = HostapdCLI(config=ssid + '.conf')
+
+        ordered_network = device.get_ordered_network(ssid)
+        network = ordered_network.network_object
+
+        self.wd.wait_for_object_condition(network, 'not obj.connected')
+
+        start = time.monotonic()
+
+        network.connect()
+
+        self.wd.wait_for_object_condition(device,
+                                    'obj.state == DeviceState.connected')
+        connected = time.monotonic() - start
+
+        hapd.wait_for_event('AP-STA-CONNECTED')
+        ap_connected = hapd.last_event_time - start
+
+        device.disconnect()
+
+        self.wd.wait_for_object_condition(network, 'not obj.connected')
+
+        return connected, ap_connected
+
+    def bench_connect(self, ssid, name, warmup=False):
+        device = self.wd.list_devices(1)[0]
+        connected = Benchmark(name + '.connected')
+        ap_connected = Benchmark(name + '.ap-sta-connected')
+
+        # e.g. to have the keys for FILS from an initial full EAP exchange
+        if warmup:
+            self.connect(device, ssid)
+
+        for i in range(Benchmark.runs()):
+            station, ap = self.connect(device, ssid)
+
+            connected.add(station)
+            ap_connected.add(ap)
+
+        connected.save()
+        ap_connected.save()
+
+    def test_open(self):
+        self.bench_connect('ssidOpen', 'open')
+
+    def test_psk(self):
+        self.bench_connect('ssidPSK', 'psk')
+
+    def test_sae(self):
+        self.bench_connect('ssidSAE', 'sae')
+
+    def test_owe(self):
+        self.bench_connect('ssidOWE', 'owe')
+
+    def test_fils(self):
+        self.bench_connect('ssidFILS', 'fils', warmup=True)
+
+    def test_eap_tls(self):
+        self.bench_connect('ssidTLS', 'eap-tls')
+
+    @classmethod
+    def setUpClass(cls):
+        IWD.copy_to_storage('ssidPSK.psk')
+        IWD.copy_to_storage('ssidSAE.psk')
+        IWD.copy_to_storage('ssidFILS.8021x')
+        IWD.copy_to_storage('ssidTLS.8021x')
+        os.system('ip link set lo up')
+
+        cls.wd = IWD()
+
+    @classmethod
+    def tearDownClass(cls):
+        IWD.clear_storage()
+        cls.wd = None
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
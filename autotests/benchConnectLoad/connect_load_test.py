@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+
+import unittest
+import sys
+
+sys.path.append('../util')
+from hostapd import HostapdCLI
+from benchmark import Benchmark
+from connectload import ConnectLoad
+from config import ctx
+
+class Test(unittest.TestCase):
+    def bench_connect(self, name, ssids, hapd):
+        associate = Benchmark(name + '.associate')
+        handshake = Benchmark(name + '.handshake')
+        total = Benchmark(name + '.total', histogram=True)
+        ap_connected = Benchmark(name + '.ap-sta-connected')
+        all_connected = Benchmark(name + '.all-connected')
+
+        for i in range(Benchmark.runs()):
+            stations = self.load.connect(ssids)
+
+            for n, station in enumerate(stations):
+                # The AP may report the station after iwd's Connect reply
+                ap_time = ctx.non_block_wait(hapd[n % len(hapd)].event_time,
+                            10, 'AP-STA-CONNECTED ' + station.device.address,
+                            station.started,
+                            exception=TimeoutError('AP-STA-CONNECTED missing'))
+
+                associate.add(station.associated - station.started)
+                handshake.add(station.connected - station.associated)
+                total.add(station.connected - station.started)
+                ap_connected.add(ap_time - station.started)
+
+            all_connected.add(max(s.connected for s in stations) -
+                                min(s.started for s in stations))
+
+            self.load.disconnect()
+
+        for benchmark in [associate, handshake, total, ap_connected,
+                            all_connected]:
+            benchmark.save()
+
+    def test_one_ap(self):
+        self.bench_connect('1ap', ['Load0'], self.hapd[:1])
+
+    def test_two_aps(self):
+        self.bench_connect('2ap', ['Load0', 'Load1'], self.hapd)
+
+    @classmethod
+    def setUpClass(cls):
+        cls.hapd = [HostapdCLI(config='generated-0.conf'),
+                    HostapdCLI(config='generated-1.conf')]
+        cls.load = ConnectLoad(['ns%u' % i for i in range(8)],
+                                ['Load0', 'Load1'])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.load.stop()
+        cls.load = None
+        cls.hapd = None
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
@@ -0,0 +1,202 @@
+#!/usr/bin/python3
+
+import unittest
+import sys
+import os
+import time
+
+sys.path.append('../util')
+from iwd import IWD
+from hwsim import Hwsim
+from hwsim import signal_ramp
+from hostapd import HostapdCLI
+from benchmark import Benchmark
+from config import ctx
+
+class Test(unittest.TestCase):
+    #
+    # Each roam is split into these phases using the StationDebug events.
+    # A phase starts at the last of its start events seen before its end
+    # event, phases without their events (e.g. neighbor report and scan for
+    # StationDebug.Roam) are skipped.
+    #
+    phases = [
+        ('neighbor-report', ['roam-started'], 'roam-neighbor-report'),
+        ('scan', ['roam-started', 'roam-neighbor-report'], 'roam-scan-done'),
+        ('authenticate', ['roam-authenticating'], 'roam-associating'),
+        ('reassociate', ['roam-associating'], 'roam-associated'),
+        ('handshake', ['roam-associated'], 'roam-complete'),
+    ]
+
+    def wait_for_roam(self, device, since):
+        def roam_done():
+            return [e for t, e in device.event_log(since)
+                        if e in ['roam-complete', 'roam-failed']]
+
+        ctx.non_block_wait(roam_done, 30,
+                            exception=TimeoutError('Roam did not finish'))
+
+        if 'roam-failed' in roam_done():
+            raise Exception('Roam failed')
+
+        return device.event_log(since)
+
+    def split(self, log):
+        '''
+            Returns the duration of each phase found in the event log of
+            a single roam
+        '''
+        durations = {}
+
+        for name, starts, end in self.phases:
+            end_times = [t for t, e in log if e == end]
+            if not end_times:
+                continue
+
+            start_times = [t for t, e in log if e in starts and
+                                t <= end_times[0]]
+            if not start_times:
+                continue
+
+            durations[name] = end_times[0] - start_times[-1]
+
+        return durations
+
+    def roam(self, device, hapd, rules, cur, forced):
+        '''
+            Roams from BSS 'cur' to the other one, either through
+            StationDebug.Roam or by moving the station away from 'cur' and
+            towards the other BSS with the hwsim signal rules. Returns the
+            StationDebug events of the roam and the time it started.
+        '''
+        target = 1 - cur
+        since = time.monotonic()
+
+        if forced:
+            device.roam(hapd[target].bssid)
+        else:
+            rules[cur].set_signal_trajectory(signal_ramp(-4000, -8000, 1000))
+            rules[target].set_signal_trajectory(signal_ramp(-8000, -4000,
+                                                            1000))
+
+        log = self.wait_for_roam(device, since)
+
+        hapd[target].wait_for_event('AP-STA-CONNECTED %s' % device.address)
+
+        if not forced:
+            since = [t for t, e in log if e == 'roam-started'][-1]
+
+        return log, since, hapd[target].last_event_time
+
+    def bench_roam(self, ssid, name, configs, radios):
+        device = self.wd.list_devices(1)[0]
+        hapd = [HostapdCLI(config=c) for c in configs]
+        rules = [self.hwsim.rules.create(
+                        source=self.hwsim.get_radio(r).addresses[0],
+                        bidirectional=True, signal=-4000, enabled=True)
+                    for r in radios]
+
+        # Fill in the neighbor AP tables so that roams start with a neighbor
+        # report, channel 1 for BSS 0 and 6 for BSS 1
+        hapd[0].set_neighbor(hapd[1].bssid, ssid,
+                ''.join(hapd[1].bssid.split(':')) + '8f0000005106060603000000')
+        hapd[1].set_neighbor(hapd[0].bssid, ssid,
+                ''.join(hapd[0].bssid.split(':')) + '8f0000005101060603000000')
+
+        # Subscribe to the StationDebug events before the first roam
+        device.event_log()
+
+        ordered_network = device.get_ordered_network(ssid, full_scan=True)
+        network = ordered_network.network_object
+
+        self.wd.wait_for_object_condition(network, 'not obj.connected')
+
+        device.connect_bssid(hapd[0].bssid)
+
+        self.wd.wait_for_object_condition(device,
+                                    'obj.state == DeviceState.connected')
+        hapd[0].wait_for_event('AP-STA-CONNECTED %s' % device.address)
+
+        cur = 0
+
+        for trigger in ['forced', 'signal']:
+            prefix = '%s.%s.' % (name, trigger)
+            phases = { p[0]: Benchmark(prefix + p[0])
+                        for p in self.phases }
+            total = Benchmark(prefix + 'total', histogram=True)
+            ap_connected = Benchmark(prefix + 'ap-sta-connected')
+
+            for i in range(Benchmark.runs()):
+                log, start, ap_time = self.roam(device, hapd, rules, cur,
+                                                trigger == 'forced')
+                cur = 1 - cur
+
+                for phase, duration in self.split(log).items():
+                    phases[phase].add(duration)
+
+                complete = [t for t, e in log if e == 'roam-complete'][0]
+                total.add(complete - start)
+                ap_connected.add(ap_time - start)
+
+                # Settle before the next roam so its CQM events start clean
+                self.wd.wait(1)
+
+            for benchmark in list(phases.values()) + [total, ap_connected]:
+                if benchmark.samples:
+                    benchmark.save()
+
+        device.disconnect()
+
+        self.wd.wait_for_object_condition(network, 'not obj.connected')
+
+        for rule in rules:
+            rule.remove()
+
+    def test_ft(self):
+        self.bench_roam('BenchFT', 'ft', ['ft-psk-1.conf', 'ft-psk-2.conf'],
+                        ['rad0', 'rad1'])
+
+    def test_preauth(self):
+        self.bench_roam('BenchPreauth', 'preauth',
+                        ['preauth-1.conf', 'preauth-2.conf'],
+                        ['rad4', 'rad5'])
+
+    def test_reassociate(self):
+        self.bench_roam('BenchPSK', 'reassoc', ['psk-1.conf', 'psk-2.conf'],
+                        ['rad2', 'rad3'])
+
+    def test_sae(self):
+        self.bench_roam('BenchSAE', 'sae', ['sae-1.conf', 'sae-2.conf'],
+                        ['rad6', 'rad7'])
+
+    @classmethod
+    def setUpClass(cls):
+        IWD.copy_to_storage('BenchFT.psk')
+        IWD.copy_to_storage('BenchPSK.psk')
+        IWD.copy_to_storage('BenchSAE.psk')
+        IWD.copy_to_storage('BenchPreauth.8021x')
+        os.system('ip link set lo up')
+
+        # Set the FT interface addresses to those expected by the hostapd
+        # config files
+        for i, conf in enumerate(['ft-psk-1.conf', 'ft-psk-2.conf']):
+            hapd = HostapdCLI(config=conf)
+
+            os.system('ip link set dev "%s" down' % hapd.ifname)
+            os.system('ip link set dev "%s" addr 12:00:00:00:00:%02u up' %
+                        (hapd.ifname, i + 1))
+
+            hapd.reload()
+            hapd.wait_for_event('AP-ENABLED')
+
+        cls.hwsim = Hwsim()
+        cls.wd = IWD(True)
+
+    @classmethod
+    def tearDownClass(cls):
+        IWD.clear_storage()
+        cls.wd = None
+        cls.hwsim = None
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+
+import unittest
+import sys
+import os
+import time
+import string
+
+sys.path.append('../util')
+from iwd import IWD
+from hwsim import Hwsim
+from benchmark import Benchmark
+from config import ctx
+from runner import BenchmarkResults
+
+class Test(unittest.TestCase):
+    # BSSes created on each radio by one hostapd process, see add_radio()
+    bss_per_radio = 16
+    # Consecutive BSSes share an SSID so networks have several BSSes
+    bss_per_ssid = 4
+    # The BSS counts at which the scan is measured
+    steps = [16, 32, 64, 128, 256]
+    channels = [1, 6, 11]
+    # MemAvailable (kB) needed before adding a radio, the default VM only
+    # has 256M
+    min_mem_available = 16 * 1024
+
+    def add_radio(self):
+        '''
+            Creates a hwsim radio with 'bss_per_radio' BSSes, each
+            configured from bss.conf.template, and starts a hostapd for it
+        '''
+        idx = len(self.radios)
+        available = ctx.meminfo_to_dict()['MemAvailable']
+
+        if available < self.min_mem_available:
+            raise Exception('Only %u kB of memory left with %u BSSes up, '
+                            'the VM needs more memory for this test' %
+                            (available, idx * self.bss_per_radio))
+
+        radio = self.hwsim.radios.create('scale%u' % idx)
+        ifnames = ['scl%u_%u' % (idx, n) for n in range(self.bss_per_radio)]
+
+        ctx.start_process(['iw', 'phy', radio.name, 'interface', 'add',
+                            ifnames[0], 'type', 'managed']).wait()
+
+        with open('/tmp/bss.conf.template', 'r') as f:
+            template = string.Template(f.read())
+
+        config = ''
+
+        for n, ifname in enumerate(ifnames):
+            bss = idx * self.bss_per_radio + n
+
+            # The first BSS uses the interface created above, hostapd
+            # creates the others
+            config += ('interface=%s\n' if n == 0 else '\nbss=%s\n') % ifname
+            config += 'bssid=02:5c:00:00:%02x:%02x\n' % (idx, n)
+            config += template.substitute(
+                            ssid='Scale%03u' % (bss // self.bss_per_ssid),
+                            channel=self.channels[idx % len(self.channels)])
+
+        path = '/tmp/scale-%u.conf' % idx
+
+        with open(path, 'w') as f:
+            f.write(config)
+
+        hostapd = ctx.start_process(['hostapd', path])
+        hostapd.wait_for_socket('/var/run/hostapd/' + ifnames[-1], 30)
+
+        self.radios.append(radio)
+        self.hostapd.append(hostapd)
+
+    def measure(self, count):
+        '''
+            Times Station.Scan() until the Scanning property is False again
+            and Station.GetOrderedNetworks() with 'count' BSSes around, along
+            with the CPU time iwd used for both
+        '''
+        device = self.wd.list_devices(1)[0]
+        scan = Benchmark('scan.%03u' % count)
+        ordered = Benchmark('get-ordered-networks.%03u' % count)
+        cpu = Benchmark('iwd-cpu.%03u' % count)
+
+        for i in range(Benchmark.runs()):
+            before = self.iwd.usage()
+            start = time.monotonic()
+
+            device.scan()
+
+            self.wd.wait_for_object_condition(device, 'obj.scanning')
+            self.wd.wait_for_object_condition(device, 'not obj.scanning')
+            scanned = time.monotonic()
+
+            networks = device.get_ordered_networks_raw()
+            listed = time.monotonic()
+
+            after = self.iwd.usage()
+
+            scan.add(scanned - start)
+            ordered.add(listed - scanned)
+            cpu.add(after['user'] + after['system'] -
+                        before['user'] - before['system'])
+
+        self.curve.append((count, len(networks),
+                            BenchmarkResults.percentile(scan.samples, 50),
+                            BenchmarkResults.percentile(ordered.samples, 50),
+                            sum(cpu.samples) / len(cpu.samples),
+                            after['maxrss']))
+
+        for benchmark in [scan, ordered, cpu]:
+            benchmark.save()
+
+    def test_scan_scale(self):
+        for count in self.steps:
+            while len(self.radios) * self.bss_per_radio < count:
+                self.add_radio()
+
+            self.measure(count)
+
+        print('%8s %10s %12s %12s %12s %12s' % ('BSSes', 'Networks',
+                'Scan (ms)', 'List (ms)', 'CPU (ms)', 'Peak RSS (kB)'))
+
+        for count, networks, scan, ordered, cpu, rss in self.curve:
+            print('%8u %10u %12.1f %12.1f %12.1f %12u' % (count, networks,
+                    scan * 1000, ordered * 1000, cpu * 1000, rss))
+
+    @classmethod
+    def setUpClass(cls):
+        cls.radios = []
+        cls.hostapd = []
+        cls.curve = []
+        cls.hwsim = Hwsim()
+        cls.wd = IWD(True)
+        # Also the right process when iwd runs under valgrind
+        cls.iwd = cls.wd.process
+
+    @classmethod
+    def tearDownClass(cls):
+        for hostapd in cls.hostapd:
+            ctx.stop_process(hostapd)
+
+        for idx, radio in enumerate(cls.radios):
+            radio.remove()
+            os.remove('/tmp/scale-%u.conf' % idx)
+
+        cls.wd = None
+        cls.iwd = None
+        cls.hwsim = None
+
+if __name__ == '__main__':
+    unittest.main(exit=True)
@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+import os
+import json
+
+from config import ctx
+from runner import BENCHMARK_SAMPLES
+
+class Benchmark(object):
+    '''
+        Latency samples (in seconds) of one metric of a benchmark scenario,
+        see test-runner --benchmark. The samples are handed to test-runner
+        by save(), which reports the percentiles of all scenarios at the end
+        of the run, along with a latency histogram if 'histogram' is set.
+    '''
+    def __init__(self, metric, histogram=False):
+        self.metric = metric
+        self.histogram = histogram
+        self.samples = []
+
+    @staticmethod
+    def runs():
+        '''
+            Number of times each benchmark should be measured (--bench-runs)
+        '''
+        return ctx.args.bench_runs
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def save(self):
+        sample = { 'scenario': os.path.basename(os.getcwd()),
+                    'metric': self.metric, 'samples': self.samples }
+
+        if self.histogram:
+            sample['histogram'] = True
+
+        with open(BENCHMARK_SAMPLES, 'a') as f:
+            f.write(json.dumps(sample) + '\n')
+
+        self.samples = []
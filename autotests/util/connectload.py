@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+import os
+import shutil
+import time
+
+from iwd import IWD
+from config import ctx
+
+class LoadStation(object):
+    '''
+        An iwd instance, started by ConnectLoad, in its own namespace along
+        with the times of its last connection.  All times are time.monotonic()
+        values, 'associated' and 'connected' are None until iwd gets there.
+    '''
+    def __init__(self, namespace, profiles):
+        self.namespace = namespace
+        self.storage_dir = '/tmp/iwd-%s' % namespace.name
+
+        os.makedirs(self.storage_dir, exist_ok=True)
+
+        for name, content in profiles.items():
+            IWD.create_in_storage(name, content, self.storage_dir)
+
+        self.wd = IWD(True, iwd_storage_dir=self.storage_dir,
+                        namespace=namespace)
+        self.device = self.wd.list_devices(1)[0]
+        self.networks = {}
+
+        # Subscribe to the StationDebug events before the first connection
+        self.device.event_log()
+
+        self.started = None
+        self.associated = None
+        self.connected = None
+        self.network = None
+        self.error = None
+
+    @property
+    def done(self):
+        return self.connected is not None or self.error is not None
+
+    def _connect_done(self):
+        self.connected = time.monotonic()
+
+    def _connect_failed(self, ex):
+        self.error = ex
+
+    def find(self, ssid):
+        if ssid not in self.networks:
+            ordered_network = self.device.get_ordered_network(ssid,
+                                                            full_scan=True)
+            self.networks[ssid] = ordered_network.network_object
+
+        return self.networks[ssid]
+
+    def connect(self, ssid):
+        self.network = self.find(ssid)
+        self.associated = None
+        self.connected = None
+        self.error = None
+
+        self.started = time.monotonic()
+        self.network.connect_async(self._connect_done, self._connect_failed)
+
+    def _find_associated(self):
+        for t, e in self.device.event_log(self.started):
+            if e == 'associated':
+                self.associated = t
+                return True
+
+        return False
+
+    def update(self, timeout=5):
+        '''
+            Picks the association time of the last connection from the
+            StationDebug events
+        '''
+        ctx.non_block_wait(self._find_associated, timeout,
+                            exception=Exception('%s: no StationDebug '
+                                'associated event after the connection' %
+                                self.namespace.name))
+
+    def disconnect(self):
+        if not self.network or not self.network.connected:
+            return
+
+        self.device.disconnect()
+        self.wd.wait_for_object_condition(self.network, 'not obj.connected')
+
+class ConnectLoad(object):
+    '''
+        Load driver connecting the stations of several iwd instances at the
+        same time.  An iwd is started in each of the 'namespaces' (names of
+        the [NameSpaces] entries in hw.conf, each with one radio) with a
+        profile for each of the 'ssids', using 'passphrase' or None for open
+        networks.  Autoconnect is disabled in the profiles so that only
+        connect() starts connections.
+    '''
+    def __init__(self, namespaces, ssids, passphrase='secret123'):
+        if passphrase:
+            suffix = '.psk'
+            content = '[Security]\nPassphrase=%s\n' % passphrase
+        else:
+            suffix = '.open'
+            content = ''
+
+        content += '[Settings]\nAutoConnect=false\n'
+        profiles = { ssid + suffix: content for ssid in ssids }
+
+        self.stations = []
+
+        for name in namespaces:
+            namespace = ctx.get_namespace(name)
+            if not namespace:
+                raise Exception('Namespace %s not in hw.conf' % name)
+
+            self.stations.append(LoadStation(namespace, profiles))
+
+        # Scan once up front so that the scans aren't part of the timings
+        for station in self.stations:
+            for ssid in ssids:
+                station.find(ssid)
+
+    def connect(self, ssids, timeout=30):
+        '''
+            Connects station n to ssids[n % len(ssids)].  All the
+            Network.Connect() calls are made before waiting for any of the
+            replies.  Returns the stations once all of them are connected.
+        '''
+        for n, station in enumerate(self.stations):
+            station.connect(ssids[n % len(ssids)])
+
+        ctx.non_block_wait(lambda: all(s.done for s in self.stations),
+                            timeout,
+                            exception=TimeoutError('Stations not connected'))
+
+        for station in self.stations:
+            if station.error:
+                raise Exception('%s failed to connect: %s' %
+                                    (station.namespace.name, station.error))
+
+            station.update()
+
+        return self.stations
+
+    def disconnect(self):
+        for station in self.stations:
+            station.disconnect()
+
+    def stop(self):
+        for station in self.stations:
+            station.wd = None
+            shutil.rmtree(station.storage_dir, ignore_errors=True)
+
+        self.stations = []
@@ -31,6 +31,8 @@ mainloop = GLib.MainLoop()
 
 class HostapdCLI(object):
     _instances = WeakValueDictionary()
+    # Set when a request timed out, its reply may still arrive
+    _resync = False
 
     def __new__(cls, config=None, *args, **kwargs):
         hapd = ctx.get_hapd_instance(config)
@@ -72,8 +74,6 @@ class HostapdCLI(object):
         self.ifname = self.interface.name
         self.socket_path = os.path.dirname(self.interface.ctrl_interface)
 
-        self.cmdline = ['hostapd_cli', '-p', self.socket_path, '-i', self.ifname]
-
         self.local_ctrl = '/tmp/hostapd_' + str(os.getpid()) + '_' + \
                             str(ctrl_count)
         self.ctrl_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
@@ -82,6 +82,13 @@ class HostapdCLI(object):
         self.ctrl_sock.connect(self.socket_path + '/' + self.ifname)
 
         self.events = []
+        # Receive time (time.monotonic()) of each event in self.events
+        self.event_times = []
+        # Receive time of the event last returned by wait_for_event()
+        self.last_event_time = None
+        self.replies = []
+        # Parsed STATUS, cleared by events changing the AP state
+        self._status = None
         self.io_watch = GLib.io_add_watch(self.ctrl_sock, GLib.IO_IN, self._handle_data_in)
 
         if 'OK' not in self._ctrl_request('ATTACH'):
@@ -90,15 +97,29 @@ class HostapdCLI(object):
         ctrl_count = ctrl_count + 1
 
     def _handle_data_in(self, sock, *args):
-        newdata = sock.recv(4096)
+        # The data may have been read by _drain() already
+        try:
+            newdata = sock.recv(4096, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return True
 
         decoded = newdata.decode('utf-8')
-        if len(decoded) >= 3 and decoded[0] == '<' and decoded[2] == '>':
-            decoded = decoded[3:]
+
+        # Unsolicited events start with a <level> prefix, anything else is
+        # the reply to the (single) outstanding request
+        if len(decoded) < 3 or decoded[0] != '<' or decoded[2] != '>':
+            self.replies.append(decoded)
+            return True
+
+        decoded = decoded[3:]
         while len(decoded) and decoded[-1] == '\n':
             decoded = decoded[:-1]
 
+        if decoded.startswith(('AP-ENABLED', 'AP-DISABLED', 'AP-CSA-FINISHED')):
+            self._status = None
+
         self.events.insert(0, decoded)
+        self.event_times.insert(0, time.monotonic())
 
         return True
 
@@ -111,7 +132,9 @@ class HostapdCLI(object):
                 if d in e:
                     raise Exception('Event %s found while waiting for %s' % (d, event))
             if event in e:
+                self.last_event_time = self.event_times[idx]
                 self.events = self.events[:idx]
+                self.event_times = self.event_times[:idx]
                 return e
 
         return False
@@ -124,22 +147,63 @@ class HostapdCLI(object):
         return ctx.non_block_wait(self._poll_event, timeout, event, disallow,
                                     exception=TimeoutError("waiting for event"))
 
-    def _data_available(self):
-        [r, w, e] = select.select([self.ctrl_sock], [], [])
-        if r:
-            return True
-        return False
+    def event_time(self, event, since=0):
+        '''
+            Receive time of the oldest event containing 'event' received at
+            or after 'since' (a time.monotonic() value), or None.  Unlike
+            wait_for_event() this does not consume the events.
+        '''
+        for e, t in reversed(list(zip(self.events, self.event_times))):
+            if t >= since and event in e:
+                return t
+
+        return None
+
+    def _reply_available(self):
+        return len(self.replies) > 0
+
+    def _drain(self):
+        '''
+            Handles whatever is already queued on the control socket
+        '''
+        while select.select([self.ctrl_sock], [], [], 0)[0]:
+            self._handle_data_in(self.ctrl_sock)
+
+    def _pong_received(self):
+        return any(r.startswith('PONG') for r in self.replies)
 
     def _ctrl_request(self, command, timeout=10):
         if type(command) is str:
             command = str.encode(command)
 
+        #
+        # Replies carry nothing to match them with their request. After a
+        # request timed out its reply may still come at any time, so PING
+        # first: hostapd answers in order and everything before the PONG
+        # belongs to older requests.
+        #
+        if self._resync:
+            self.replies = []
+            self.ctrl_sock.send(b'PING')
+
+            ctx.non_block_wait(self._pong_received, timeout,
+                            exception=TimeoutError("waiting for PONG"))
+
+            self._resync = False
+
+        self._drain()
+        self.replies = []
+
         self.ctrl_sock.send(bytes(command))
 
-        ctx.non_block_wait(self._data_available, timeout,
+        try:
+            ctx.non_block_wait(self._reply_available, timeout,
                             exception=TimeoutError("waiting for control response"))
+        except TimeoutError:
+            self._resync = True
+            raise
 
-        return self.ctrl_sock.recv(4096).decode('utf-8')
+        return self.replies.pop(0)
 
     def __del__(self):
         if self.ctrl_sock:
@@ -151,53 +215,55 @@ class HostapdCLI(object):
             pass
 
     def set_value(self, key, value):
-        cmd = self.cmdline + ['set', key, value]
-        ctx.start_process(cmd).wait()
+        self._status = None
+        self._ctrl_request('SET %s %s' % (key, value))
 
     def wps_push_button(self):
-        ctx.start_process(self.cmdline + ['wps_pbc']).wait()
+        self._ctrl_request('WPS_PBC')
 
     def wps_pin(self, pin):
-        cmd = self.cmdline + ['wps_pin', 'any', pin]
-        ctx.start_process(cmd).wait()
+        self._ctrl_request('WPS_PIN any %s' % pin)
 
     def deauthenticate(self, client_address):
-        cmd = self.cmdline + ['deauthenticate', client_address]
-        ctx.start_process(cmd).wait()
+        self._ctrl_request('DEAUTHENTICATE ' + client_address)
 
     def eapol_reauth(self, client_address):
         self.events = []
-        cmd = 'EAPOL_REAUTH ' + client_address
-        self.ctrl_sock.sendall(cmd.encode('utf-8'))
+        self.event_times = []
+        self._ctrl_request('EAPOL_REAUTH ' + client_address)
         self.wait_for_event('CTRL-EVENT-EAP-STARTED', disallow=['AP-STA-DISCONNECTED'])
         self.wait_for_event('CTRL-EVENT-EAP-SUCCESS', disallow=['AP-STA-DISCONNECTED'])
 
     def reload(self):
         # Seemingly all three commands needed for the instance to notice
         # interface's address change
-        ctx.start_process(self.cmdline + ['reload']).wait()
-        ctx.start_process(self.cmdline + ['disable']).wait()
-        ctx.start_process(self.cmdline + ['enable']).wait()
+        self._status = None
+        self._ctrl_request('RELOAD')
+        self._ctrl_request('DISABLE')
+        self._ctrl_request('ENABLE')
 
     def disable(self):
-        ctx.start_process(self.cmdline + ['disable']).wait()
+        self._status = None
+        self._ctrl_request('DISABLE')
 
     def list_sta(self):
-        proc = ctx.start_process(self.cmdline + ['list_sta'])
-        proc.wait()
+        # Same as 'hostapd_cli list_sta', the first line of each STA-FIRST /
+        # STA-NEXT reply is the station address
+        stations = []
+        reply = self._ctrl_request('STA-FIRST')
 
-        if not proc.out:
-            return []
+        while reply and not reply.startswith('FAIL'):
+            addr = reply.split('\n')[0]
+            stations.append(addr)
+            reply = self._ctrl_request('STA-NEXT ' + addr)
 
-        return [line for line in proc.out.split('\n') if line]
+        return stations
 
     def set_neighbor(self, addr, ssid, nr):
-        cmd = self.cmdline + ['set_neighbor', addr, 'ssid="%s"' % ssid, 'nr=%s' % nr]
-        ctx.start_process(cmd).wait()
+        self._ctrl_request('SET_NEIGHBOR %s ssid="%s" nr=%s' % (addr, ssid, nr))
 
     def remove_neighbor(self, addr):
-        cmd = self.cmdline + ['remove_neighbor', addr]
-        ctx.start_process(cmd).wait()
+        self._ctrl_request('REMOVE_NEIGHBOR ' + addr)
 
     def send_bss_transition(self, device, nr_list):
         # Send a BSS transition to a station (device). nr_list should be an
@@ -206,7 +272,7 @@ class HostapdCLI(object):
         # consistent with the set_neighbor() API, i.e. the same neighbor report
         # string could be used in both API's.
         pref = 1
-        cmd = self.cmdline + ['bss_tm_req', device]
+        cmd = ['BSS_TM_REQ', device]
         for i in nr_list:
             addr = i[0]
             nr = i[1]
@@ -220,54 +286,49 @@ class HostapdCLI(object):
                         (addr, bss_info, op_class, chan_num, phy_num)]
             pref += 1
 
-        proc = ctx.start_process(cmd)
-        proc.wait()
-
-        if 'OK' not in proc.out:
+        if 'OK' not in self._ctrl_request(' '.join(cmd)):
             raise Exception('BSS_TM_REQ failed, is hostapd built with CONFIG_WNM_AP=y?')
 
     def req_beacon(self, addr, request):
         '''
             Send a RRM Beacon request
         '''
-        cmd = self.cmdline + ['req_beacon', addr, request]
-        ctx.start_process(cmd).wait()
+        self._ctrl_request('REQ_BEACON %s %s' % (addr, request))
 
     def rekey(self, address=None):
         if address:
-            cmd = 'REKEY_PTK %s' % address
-            self.ctrl_sock.sendall(cmd.encode('utf-8'))
             self.events = []
+            self.event_times = []
+            self._ctrl_request('REKEY_PTK %s' % address)
             self.wait_for_event('EAPOL-4WAY-HS-COMPLETED', disallow=['AP-STA-DISCONNECTED'])
             return
 
-        cmd = 'REKEY_GTK'
-        self.ctrl_sock.sendall(cmd.encode('utf-8'))
+        self._ctrl_request('REKEY_GTK')
 
     def resend_m3(self, address):
-        cmd = 'RESEND_M3 %s' % address
-        self.ctrl_sock.sendall(cmd.encode('utf-8'))
+        self._ctrl_request('RESEND_M3 %s' % address)
 
     def chan_switch(self, channel):
         if channel > len(chan_freq_map):
             raise Exception("Only 2.4GHz channels supported for chan_switch")
 
-        cmd = self.cmdline + ['chan_switch', '50', str(chan_freq_map[channel])]
-        ctx.start_process(cmd).wait()
+        self._ctrl_request('CHAN_SWITCH 50 %u' % chan_freq_map[channel])
         self.wait_for_event('AP-CSA-FINISHED')
 
     def _get_status(self):
+        if self._status is not None:
+            return self._status
+
         ret = {}
 
-        cmd = self.cmdline + ['status']
-        proc = ctx.start_process(cmd)
-        proc.wait()
-        status = proc.out.strip().split('\n')
+        status = self._ctrl_request('STATUS').strip().split('\n')
 
         for kv in status:
-            k, v = kv.split('=')
+            k, v = kv.split('=', 1)
             ret[k] = v
 
+        self._status = ret
+
         return ret
 
     @property
@@ -1,13 +1,12 @@
 #!/usr/bin/python3
 import dbus
 import sys
+import struct
 
 from collections.abc import Mapping
 from weakref import WeakValueDictionary
 from abc import ABCMeta, abstractmethod
 from enum import Enum
-from scapy.all import *
-from scapy.contrib.wpa_eapol import WPA_key
 
 import iwd
 from config import ctx
@@ -21,6 +20,42 @@ HWSIM_INTERFACE_INTERFACE =     'net.connman.hwsim.Interface'
 
 HWSIM_AGENT_MANAGER_PATH =      '/'
 
+def signal_ramp(start, end, duration, interval=100):
+    '''
+        Trajectory changing the signal linearly from 'start' to 'end' over
+        'duration' ms in steps of 'interval' ms, see
+        Rule.set_signal_trajectory()
+    '''
+    count = max(1, duration // interval)
+
+    return [(i * duration // count, start + (end - start) * i // count)
+                for i in range(count + 1)]
+
+def signal_steps(values, interval):
+    '''
+        Trajectory applying each signal in 'values' for 'interval' ms
+    '''
+    return [(i * interval, value) for i, value in enumerate(values)]
+
+def signal_trace(path):
+    '''
+        Trajectory read from a recorded trace file with one '<time> <signal>'
+        pair per line, time in ms and signal in 100 * dBm like Rule.signal.
+        Empty lines and lines starting with '#' are ignored.
+    '''
+    steps = []
+
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            time, signal = line.split()
+            steps.append((int(time), int(signal)))
+
+    return steps
+
 class HwsimDBusAbstract(iwd.AsyncOpAbstract):
     __metaclass__ = ABCMeta
 
@@ -55,6 +90,52 @@ class HwsimDBusAbstract(iwd.AsyncOpAbstract):
 class Rule(HwsimDBusAbstract):
     _iface_name = HWSIM_RULE_INTERFACE
 
+    # Keyword arguments of RuleSet.create() and Rule.update() with the D-Bus
+    # property name and type for each
+    _dbus_properties = {
+        'source': ('Source', dbus.String),
+        'destination': ('Destination', dbus.String),
+        'bidirectional': ('Bidirectional', dbus.Boolean),
+        'frequency': ('Frequency', dbus.UInt32),
+        'priority': ('Priority', dbus.Int16),
+        'signal': ('SignalStrength', dbus.Int16),
+        'drop': ('Drop', dbus.Boolean),
+        'delay': ('Delay', dbus.UInt32),
+        'prefix': ('Prefix', dbus.ByteArray.fromhex),
+        'enabled': ('Enabled', dbus.Boolean),
+        'match_times': ('MatchTimes', dbus.UInt16),
+        'drop_ack': ('DropAck', dbus.Boolean),
+        'match': ('MatchBytes', dbus.ByteArray.fromhex),
+        'match_offset': ('MatchBytesOffset', dbus.UInt16),
+    }
+
+    @classmethod
+    def _to_dbus(cls, props):
+        values = dbus.Dictionary({}, signature='sv')
+
+        for name, value in props.items():
+            if name not in cls._dbus_properties:
+                raise Exception('Unknown rule property %s' % name)
+
+            prop, convert = cls._dbus_properties[name]
+            values[prop] = convert(value)
+
+        return values
+
+    def update(self, **props):
+        '''
+            Set several properties in a single D-Bus call, e.g.
+            rule.update(signal=-8000, enabled=True)
+        '''
+        values = self._to_dbus(props)
+
+        self._iface.Update(values, reply_handler=self._success,
+                                error_handler=self._failure)
+        self._wait_for_async_op()
+
+        # PropertiesChanged is only emitted after the reply
+        self._properties.update(values)
+
     @property
     def source(self):
         return self._properties['Source']
@@ -187,6 +268,64 @@ class Rule(HwsimDBusAbstract):
     def match_offset(self, value):
         self._prop_proxy.Set(self._iface_name, 'MatchBytesOffset', dbus.UInt16(value))
 
+    # The counters change with every frame and are not signalled, so they
+    # are always read from hwsim
+    @property
+    def match_count(self):
+        '''
+            Number of frames this rule was applied to
+        '''
+        return int(self._prop_proxy.Get(self._iface_name, 'MatchCount'))
+
+    @property
+    def drop_count(self):
+        '''
+            Number of frames this rule dropped
+        '''
+        return int(self._prop_proxy.Get(self._iface_name, 'DropCount'))
+
+    @property
+    def delay_count(self):
+        '''
+            Number of frames this rule delayed
+        '''
+        return int(self._prop_proxy.Get(self._iface_name, 'DelayCount'))
+
+    @property
+    def signal_trajectory_active(self):
+        return bool(self._properties['SignalTrajectoryActive'])
+
+    def set_signal_trajectory(self, steps):
+        '''
+            Have hwsim change the signal of this rule over time, on its own
+            timer. 'steps' is a list of (time, signal) tuples, with time in
+            ms since this call, see signal_ramp(), signal_steps() and
+            signal_trace(). An empty list stops the current trajectory, as
+            does setting 'signal'.
+        '''
+        array = dbus.Array([dbus.Struct((dbus.UInt32(t), dbus.Int16(s)))
+                                for t, s in steps], signature='(un)')
+
+        self._iface.SetSignalTrajectory(array, reply_handler=self._success,
+                                error_handler=self._failure)
+        self._wait_for_async_op()
+
+        #
+        # The PropertiesChanged signals may have been handled while waiting
+        # or may still come, the value read after the reply is current.
+        #
+        self._properties['SignalTrajectoryActive'] = self._prop_proxy.Get(
+                    self._iface_name, 'SignalTrajectoryActive')
+
+    def wait_for_signal_trajectory(self, max_wait=30):
+        '''
+            Wait until the last step of the signal trajectory was applied
+        '''
+        ctx.non_block_wait(lambda rule: not rule.signal_trajectory_active,
+                                max_wait, self,
+                                exception=TimeoutError('Signal trajectory '
+                                                        'did not finish'))
+
     def remove(self):
         self._iface.Remove(reply_handler=self._success,
                 error_handler=self._failure)
@@ -243,8 +382,13 @@ class RuleSet(Mapping):
     def _interfaces_removed_handler(self, path, interfaces):
         del _dict[path]
 
-    def create(self):
-        path = self._rule_manager.AddRule()
+    def create(self, **props):
+        '''
+            Create a rule, optionally fully configured in a single D-Bus
+            call by passing any Rule properties, e.g.
+            create(source=addr, signal=-4000, enabled=True)
+        '''
+        path = self._rule_manager.AddRule(Rule._to_dbus(props))
         obj = Rule(path)
         self._dict[path] = obj
         return obj
@@ -398,10 +542,14 @@ class Hwsim(iwd.AsyncOpAbstract):
     def object_manager(self):
         return self._object_manager_if
 
+    # scapy takes seconds to load, so it is only imported once one of the
+    # spoof_* methods is actually used.
     def spoof_disassociate(self, radio, freq, station):
         '''
             Send a spoofed disassociate frame to a station
         '''
+        from scapy.all import Dot11, Dot11Disas, raw
+
         frame = Dot11()/Dot11Disas(reason=7)
         frame[Dot11].addr1 = station
         frame[Dot11].addr2 = radio.addresses[0]
@@ -413,6 +561,8 @@ class Hwsim(iwd.AsyncOpAbstract):
         '''
             Send a spoofed deauthenticate frame to a station
         '''
+        from scapy.all import Dot11, Dot11Deauth, raw
+
         frame = Dot11()/Dot11Deauth(reason=6)
         frame[Dot11].addr1 = station
         frame[Dot11].addr2 = radio.addresses[0]
@@ -424,6 +574,8 @@ class Hwsim(iwd.AsyncOpAbstract):
         '''
             Send a spoofed EAP-Failure frame to a station
         '''
+        from scapy.all import Dot11, LLC, SNAP, EAPOL, EAP, raw
+
         frame = Dot11(type="Data", subtype=0)
         frame[Dot11].addr1 = station
         frame[Dot11].addr2 = radio.addresses[0]
@@ -437,6 +589,9 @@ class Hwsim(iwd.AsyncOpAbstract):
         '''
             Send a spoofed PTK 1/4 frame to a station
         '''
+        from scapy.all import Dot11, LLC, SNAP, EAPOL, raw
+        from scapy.contrib.wpa_eapol import WPA_key
+
         frame = Dot11(type="Data", subtype=0)
         frame[Dot11].addr1 = station
         frame[Dot11].addr2 = radio.addresses[0]
@@ -124,6 +124,8 @@ class IWDDBusAbstract(AsyncOpAbstract):
     __metaclass__ = ABCMeta
 
     def __init__(self, object_path = None, properties = None, service=IWD_SERVICE, namespace=ctx):
+        # Called whenever a property changes, see IWD.wait_for_object_condition
+        self._waiters = []
         self._bus = namespace.get_bus()
         self._namespace = namespace
 
@@ -147,6 +149,12 @@ class IWDDBusAbstract(AsyncOpAbstract):
             for name, value in changed.items():
                 self._properties[name] = value
 
+            self._notify_waiters()
+
+    def _notify_waiters(self):
+        for waiter in list(self._waiters):
+            waiter()
+
     @abstractmethod
     def __str__(self):
         pass
@@ -234,6 +242,7 @@ class StationDebug(IWDDBusAbstract):
 
     def __init__(self, *args, **kwargs):
         self._events = []
+        self._event_log = []
 
         IWDDBusAbstract.__init__(self, *args, **kwargs)
 
@@ -241,6 +250,7 @@ class StationDebug(IWDDBusAbstract):
 
     def _event_handler(self, event, data):
         self._events.insert(0, (event, data))
+        self._event_log.append((time.monotonic(), event))
 
     @property
     def autoconnect(self):
@@ -269,6 +279,14 @@ class StationDebug(IWDDBusAbstract):
         return ctx.non_block_wait(self._poll_event, timeout, event,
                                     exception=TimeoutError("waiting for event"))
 
+    def event_log(self, since=0):
+        '''
+            (time, event) tuples of the events received at or after 'since'
+            (a time.monotonic() value), oldest first.  Unlike
+            wait_for_event() this does not consume the events.
+        '''
+        return [e for e in self._event_log if e[0] >= since]
+
 class DeviceProvisioning(IWDDBusAbstract):
     '''
         Class represents net.connman.iwd.DeviceProvisioning
@@ -383,6 +401,8 @@ class Device(IWDDBusAbstract):
                 if name == 'Mode' and value != 'station':
                     self._station_debug_obj = None
 
+            self._notify_waiters()
+
     @property
     def device_path(self):
         '''
@@ -515,8 +535,7 @@ class Device(IWDDBusAbstract):
             elif not scan_if_needed:
                 return None
 
-        condition = 'not obj.scanning'
-        IWD._wait_for_object_condition(self, condition)
+        IWD._wait_for_object_condition(self, {'scanning': False})
 
         try:
             if full_scan:
@@ -526,10 +545,8 @@ class Device(IWDDBusAbstract):
         except InProgressEx:
             pass
 
-        condition = 'obj.scanning'
-        IWD._wait_for_object_condition(self, condition)
-        condition = 'not obj.scanning'
-        IWD._wait_for_object_condition(self, condition)
+        IWD._wait_for_object_condition(self, {'scanning': True})
+        IWD._wait_for_object_condition(self, {'scanning': False})
 
         for bus_obj in self._station.GetOrderedNetworks():
             ordered_network = OrderedNetwork(bus_obj, self._bus, self._namespace)
@@ -540,6 +557,14 @@ class Device(IWDDBusAbstract):
 
         return None
 
+    def get_ordered_networks_raw(self):
+        '''
+            The (object path, signal strength) tuples returned by
+            Station.GetOrderedNetworks(), without querying each network
+            like get_ordered_networks() does.
+        '''
+        return self._station.GetOrderedNetworks()
+
     def get_ordered_network(self, network, scan_if_needed = True, full_scan = False):
         '''Returns a single network from ordered network call, or None if the
            network wasn't found. If the network is not found an exception is
@@ -679,6 +704,9 @@ class Device(IWDDBusAbstract):
     def wait_for_event(self, event, timeout=10):
         self._station_debug.wait_for_event(event, timeout)
 
+    def event_log(self, since=0):
+        return self._station_debug.event_log(since)
+
     def dpp_start_enrollee(self):
         return self._device_provisioning.start_enrollee()
 
@@ -742,6 +770,15 @@ class Network(IWDDBusAbstract):
         if wait:
             self._wait_for_async_op()
 
+    def connect_async(self, reply_handler, error_handler):
+        '''
+            Same as connect() but the result is passed to 'reply_handler'
+            or 'error_handler' instead of being waited for.
+        '''
+        self._iface.Connect(dbus_interface=self._iface_name,
+                            reply_handler=reply_handler,
+                            error_handler=error_handler)
+
     def __str__(self, prefix = ''):
         return prefix + 'Network:\n' \
                 + prefix + '\tName:\t' + self.name + '\n' \
@@ -1134,6 +1171,13 @@ class IWD(AsyncOpAbstract):
 
         self.namespace = None
 
+    @property
+    def process(self):
+        '''
+            The Process of the iwd started by this instance, None otherwise
+        '''
+        return self._iwd_proc
+
     @property
     def _object_manager(self):
         if self._object_manager_if is None:
@@ -1144,46 +1188,111 @@ class IWD(AsyncOpAbstract):
         return self._object_manager_if
 
     @staticmethod
-    def _wait_for_object_condition(obj, condition_str, max_wait = 50):
-        def _eval_wrap(obj, condition_str):
-            return eval(condition_str)
+    def _condition_func(condition):
+        '''
+            Returns a function checking a wait condition against an object.
+            The condition can be a string expression using 'obj', a callable
+            taking the object or a dict of attribute names and the values
+            they are expected to have, e.g. {'state': DeviceState.connected}
+        '''
+        if isinstance(condition, str):
+            code = compile(condition, '<condition>', 'eval')
+            return lambda obj: eval(code, globals(), {'obj': obj})
 
-        ctx.non_block_wait(_eval_wrap, max_wait, obj, condition_str,
-                            exception=TimeoutError('[' + condition_str + ']'\
-                                                   ' condition was not met in '\
-                                                   + str(max_wait) + ' sec'))
+        if isinstance(condition, dict):
+            return lambda obj: all(getattr(obj, name) == value
+                                        for name, value in condition.items())
+
+        return condition
+
+    @staticmethod
+    def _condition_str(condition):
+        if isinstance(condition, str):
+            return condition
+
+        if isinstance(condition, dict):
+            return ' and '.join('obj.%s == %s' % (name, value)
+                                        for name, value in condition.items())
+
+        return getattr(condition, '__name__', str(condition))
+
+    @staticmethod
+    def _wait_for_object_event(obj, func, max_wait, exception):
+        '''
+            Waits for 'func' to return True. For D-Bus objects 'func' is only
+            called again once one of the object's properties has changed,
+            any other object is checked on every main loop iteration.
+        '''
+        if not isinstance(obj, IWDDBusAbstract):
+            ctx.non_block_wait(func, max_wait, exception=exception)
+            return
+
+        changed = [True]
+
+        def _waiter():
+            changed[0] = True
+
+        def _check():
+            if not changed[0]:
+                return False
+
+            changed[0] = False
+
+            return func()
+
+        obj._waiters.append(_waiter)
+
+        try:
+            ctx.non_block_wait(_check, max_wait, exception=exception)
+        finally:
+            obj._waiters.remove(_waiter)
+
+    @staticmethod
+    def _wait_for_object_condition(obj, condition, max_wait = 50):
+        func = IWD._condition_func(condition)
+
+        IWD._wait_for_object_event(obj, lambda: func(obj), max_wait,
+                            TimeoutError('[' + IWD._condition_str(condition) +
+                                         '] condition was not met in ' +
+                                         str(max_wait) + ' sec'))
 
     def wait_for_object_condition(self, *args, **kwargs):
         self._wait_for_object_condition(*args, **kwargs)
 
-    def wait_for_object_change(self, obj, from_str, to_str, max_wait = 50):
+    def wait_for_object_change(self, obj, from_cond, to_cond, max_wait = 50):
         '''
-            Expects condition 'from_str' to evaluate true while waiting for 'to_str'. If
-            at any point during the wait 'from_str' evaluates false, an exception is
-            raised.
+            Expects condition 'from_cond' to evaluate true while waiting for
+            'to_cond'. If at any point during the wait 'from_cond' evaluates
+            false, an exception is raised. Conditions take the same forms as
+            for wait_for_object_condition.
 
             This allows an object to be checked for a state transition without any
             intermediate state changes.
         '''
-        def _eval_from_to(obj, from_str, to_str):
+        from_func = IWD._condition_func(from_cond)
+        to_func = IWD._condition_func(to_cond)
+        from_str = IWD._condition_str(from_cond)
+        to_str = IWD._condition_str(to_cond)
+
+        def _eval_from_to():
             # If neither the initial or expected condition evaluate the
             # object must be in another unexpected state.
-            if not eval(from_str) and not eval(to_str):
+            if not from_func(obj) and not to_func(obj):
                 raise Exception('unexpected condition between [%s] and [%s]' %
                                         (from_str, to_str))
 
             # Initial condition does not evaluate but expected does, pass
-            if not eval(from_str) and eval(to_str):
+            if not from_func(obj) and to_func(obj):
                 return True
 
             return False
 
         # Does initial condition pass?
-        if not eval(from_str):
+        if not from_func(obj):
             raise Exception("initial condition [%s] not met" % from_str)
 
-        ctx.non_block_wait(_eval_from_to, max_wait, obj, from_str, to_str,
-                            exception=TimeoutError('[' + to_str + ']'\
+        IWD._wait_for_object_event(obj, _eval_from_to, max_wait,
+                            TimeoutError('[' + to_str + ']'\
                                        ' condition was not met in '\
                                        + str(max_wait) + ' sec'))
 
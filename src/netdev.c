@@ -2900,6 +2900,10 @@ process_resp_ies:
 			netdev_send_qos_map_set(netdev, qos_set, qos_len);
 	}
 
+	if (netdev->event_filter)
+		netdev->event_filter(netdev, NETDEV_EVENT_ASSOCIATED, NULL,
+					netdev->user_data);
+
 	if (netdev->sm) {
 		if (!hs->chandef) {
 			if (netdev_get_oci(netdev) < 0)
@@ -3443,7 +3447,12 @@ static void netdev_sae_tx_associate(void *user_data)
 		l_genl_msg_unref(msg);
 		netdev_connect_failed(netdev, NETDEV_RESULT_ASSOCIATION_FAILED,
 					MMPDU_STATUS_CODE_UNSPECIFIED);
+		return;
 	}
+
+	if (netdev->event_filter)
+		netdev->event_filter(netdev, NETDEV_EVENT_ASSOCIATING, NULL,
+					netdev->user_data);
 }
 
 static void netdev_fils_tx_authenticate(const uint8_t *body,
@@ -3515,7 +3524,12 @@ static void netdev_fils_tx_associate(struct iovec *fils_iov, size_t n_fils_iov,
 		l_genl_msg_unref(msg);
 		netdev_connect_failed(netdev, NETDEV_RESULT_ASSOCIATION_FAILED,
 					MMPDU_STATUS_CODE_UNSPECIFIED);
+		return;
 	}
+
+	if (netdev->event_filter)
+		netdev->event_filter(netdev, NETDEV_EVENT_ASSOCIATING, NULL,
+					netdev->user_data);
 }
 
 struct rtnl_data {
@@ -4418,6 +4432,10 @@ static int netdev_ft_tx_associate(struct iovec *ft_iov, size_t n_ft_iov,
 		return -EIO;
 	}
 
+	if (netdev->event_filter)
+		netdev->event_filter(netdev, NETDEV_EVENT_ASSOCIATING, NULL,
+					netdev->user_data);
+
 	return 0;
 }
 
@@ -41,6 +41,7 @@ enum netdev_result {
 enum netdev_event {
 	NETDEV_EVENT_AUTHENTICATING,
 	NETDEV_EVENT_ASSOCIATING,
+	NETDEV_EVENT_ASSOCIATED,
 	NETDEV_EVENT_ROAMING,
 	NETDEV_EVENT_ROAMED,
 	NETDEV_EVENT_CHANNEL_SWITCHED,
@@ -94,6 +95,7 @@ typedef void (*netdev_connect_cb_t)(struct netdev *netdev,
  *
  * NETDEV_EVENT_AUTHENTICATING - unused
  * NETDEV_EVENT_ASSOCIATING - unused
+ * NETDEV_EVENT_ASSOCIATED - unused
  * NETDEV_EVENT_DISCONNECT_BY_AP - MMPDU_REASON_CODE
  * NETDEV_EVENT_DISCONNECT_BY_SME - MMPDU_REASON_CODE
  * NETDEV_EVENT_RSSI_THRESHOLD_LOW - unused
@@ -158,6 +158,12 @@ static bool station_is_autoconnecting(struct station *station)
 			station->state == STATION_STATE_AUTOCONNECT_QUICK;
 }
 
+static bool station_is_roaming(struct station *station)
+{
+	return station->state == STATION_STATE_ROAMING ||
+			station->preparing_roam;
+}
+
 static bool station_debug_event(struct station *station, const char *name)
 {
 	struct l_dbus_message *signal;
@@ -1928,6 +1934,8 @@ static void station_roamed(struct station *station)
 {
 	station->roam_scan_full = false;
 
+	station_debug_event(station, "roam-complete");
+
 	/*
 	 * Schedule another roaming attempt in case the signal continues to
 	 * remain low. A subsequent high signal notification will cancel it.
@@ -1974,6 +1982,8 @@ static void station_roam_failed(struct station *station)
 {
 	l_debug("%u", netdev_get_ifindex(station->netdev));
 
+	station_debug_event(station, "roam-failed");
+
 	/*
 	 * If we attempted a reassociation or a fast transition, and ended up
 	 * here then we are now disconnected.
@@ -2263,6 +2273,8 @@ static void station_transition_start(struct station *station,
 	/* Reset AP roam flag, at this point the roaming behaves the same */
 	station->ap_directed_roaming = false;
 
+	station_debug_event(station, "roam-authenticating");
+
 	/* Can we use Fast Transition? */
 	if (station_can_fast_transition(hs, bss)) {
 		const struct network_info *info = network_get_info(connected);
@@ -2391,6 +2403,8 @@ static bool station_roam_scan_notify(int err, struct l_queue *bss_list,
 		return false;
 	}
 
+	station_debug_event(station, "roam-scan-done");
+
 	/*
 	 * Do not call station_set_scan_results because this may have been
 	 * a partial scan.  We could at most update the current networks' BSS
@@ -2568,6 +2582,8 @@ static void station_neighbor_report_cb(struct netdev *netdev, int err,
 	if (!station->preparing_roam || err == -ENODEV)
 		return;
 
+	station_debug_event(station, "roam-neighbor-report");
+
 	if (!reports || err) {
 		r = station_roam_scan_known_freqs(station);
 
@@ -2602,6 +2618,8 @@ static void station_roam_trigger_cb(struct l_timeout *timeout, void *user_data)
 	station->roam_trigger_timeout = NULL;
 	station->preparing_roam = true;
 
+	station_debug_event(station, "roam-started");
+
 	/*
 	 * If current BSS supports Neighbor Reports, narrow the scan down
 	 * to channels occupied by known neighbors in the ESS. If no neighbor
@@ -3059,6 +3077,21 @@ static void station_netdev_event(struct netdev *netdev, enum netdev_event event,
 		break;
 	case NETDEV_EVENT_ASSOCIATING:
 		l_debug("Associating");
+
+		if (station_is_roaming(station))
+			station_debug_event(station, "roam-associating");
+		else
+			station_debug_event(station, "associating");
+
+		break;
+	case NETDEV_EVENT_ASSOCIATED:
+		l_debug("Associated");
+
+		if (station_is_roaming(station))
+			station_debug_event(station, "roam-associated");
+		else
+			station_debug_event(station, "associated");
+
 		break;
 	case NETDEV_EVENT_DISCONNECT_BY_AP:
 	case NETDEV_EVENT_DISCONNECT_BY_SME:
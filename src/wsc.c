@@ -247,6 +247,7 @@ static void wsc_enrollee_netdev_event(struct netdev *netdev,
 	switch (event) {
 	case NETDEV_EVENT_AUTHENTICATING:
 	case NETDEV_EVENT_ASSOCIATING:
+	case NETDEV_EVENT_ASSOCIATED:
 		break;
 	case NETDEV_EVENT_DISCONNECT_BY_AP:
 		l_debug("Disconnect by AP");
@@ -118,6 +118,12 @@ enum hwsim_tx_control_flags {
 #define IEEE80211_TX_RATE_TABLE_SIZE	4
 #define HWSIM_DELAY_MIN_MS		1
 #define HWSIM_MAX_PREFIX_LEN		128
+#define HWSIM_MAX_TRAJECTORY_LEN	4096
+
+struct signal_step {
+	uint32_t time;		/* ms since the trajectory was set */
+	int16_t signal;
+};
 
 struct hwsim_rule {
 	unsigned int id;
@@ -139,6 +145,14 @@ struct hwsim_rule {
 	size_t match_len;
 	uint16_t match_offset;
 	int match_times; /* negative value indicates unused */
+	struct signal_step *trajectory;
+	unsigned int trajectory_len;
+	unsigned int trajectory_pos;
+	uint64_t trajectory_start;
+	struct l_timeout *trajectory_timeout;
+	uint32_t matched;
+	uint32_t dropped;
+	uint32_t delayed;
 };
 
 struct hwsim_support {
@@ -431,10 +445,159 @@ struct interface_info_rec {
 static struct l_queue *radio_info;
 static struct l_queue *interface_info;
 
+static bool radio_match_addr(const struct radio_info_rec *radio,
+				const uint8_t *addr)
+{
+	if (!radio || util_is_broadcast_address(addr))
+		return !radio && util_is_broadcast_address(addr);
+
+	return !memcmp(addr, radio->addrs[0], ETH_ALEN) ||
+		!memcmp(addr, radio->addrs[1], ETH_ALEN);
+}
+
+static bool rule_match_radios(const struct hwsim_rule *rule,
+				const struct radio_info_rec *src_radio,
+				const struct radio_info_rec *dst_radio)
+{
+	if (!rule->source_any &&
+			!radio_match_addr(src_radio, rule->source) &&
+			(!rule->bidirectional ||
+			 !radio_match_addr(dst_radio, rule->source)))
+		return false;
+
+	if (!rule->destination_any &&
+			!radio_match_addr(dst_radio, rule->destination) &&
+			(!rule->bidirectional ||
+			 !radio_match_addr(src_radio, rule->destination)))
+		return false;
+
+	/*
+	 * If source matches only because rule->bidirectional was
+	 * true, make sure destination is "any" or matches source
+	 * radio's address.
+	 */
+	if (!rule->source_any && rule->bidirectional &&
+			radio_match_addr(dst_radio, rule->source))
+		if (!rule->destination_any &&
+				!radio_match_addr(dst_radio, rule->destination))
+			return false;
+
+	return true;
+}
+
+/*
+ * The rules which can match frames from a source radio to a destination
+ * radio (NULL for multicast) on a frequency, in priority order. Built on
+ * first use from the Source, Destination, Bidirectional, Frequency and
+ * Enabled properties so that only the Prefix and MatchBytes checks are
+ * left for each frame. Flushed whenever any of those properties change
+ * or a rule or radio is added or removed.
+ */
+struct rule_index_key {
+	const struct radio_info_rec *src_radio;
+	const struct radio_info_rec *dst_radio;
+	uint32_t frequency;
+};
+
+static struct l_hashmap *rule_index;
+
+static unsigned int rule_index_hash(const void *p)
+{
+	const struct rule_index_key *key = p;
+
+	return ((uintptr_t) key->src_radio * 31 +
+			(uintptr_t) key->dst_radio) * 31 + key->frequency;
+}
+
+static int rule_index_compare(const void *a, const void *b)
+{
+	const struct rule_index_key *key_a = a;
+	const struct rule_index_key *key_b = b;
+
+	if (key_a->src_radio != key_b->src_radio)
+		return key_a->src_radio < key_b->src_radio ? -1 : 1;
+
+	if (key_a->dst_radio != key_b->dst_radio)
+		return key_a->dst_radio < key_b->dst_radio ? -1 : 1;
+
+	if (key_a->frequency != key_b->frequency)
+		return key_a->frequency < key_b->frequency ? -1 : 1;
+
+	return 0;
+}
+
+static void *rule_index_key_copy(const void *p)
+{
+	return l_memdup(p, sizeof(struct rule_index_key));
+}
+
+static void rule_index_entry_free(void *data)
+{
+	l_queue_destroy(data, NULL);
+}
+
+static void rule_index_flush(void)
+{
+	l_hashmap_destroy(rule_index, rule_index_entry_free);
+	rule_index = NULL;
+}
+
+static struct l_queue *rule_index_lookup(
+				const struct radio_info_rec *src_radio,
+				const struct radio_info_rec *dst_radio,
+				uint32_t frequency)
+{
+	struct rule_index_key key = {
+		.src_radio = src_radio,
+		.dst_radio = dst_radio,
+		.frequency = frequency,
+	};
+	const struct l_queue_entry *entry;
+	struct l_queue *matches;
+
+	if (!rule_index) {
+		rule_index = l_hashmap_new();
+		l_hashmap_set_hash_function(rule_index, rule_index_hash);
+		l_hashmap_set_compare_function(rule_index, rule_index_compare);
+		l_hashmap_set_key_copy_function(rule_index,
+							rule_index_key_copy);
+		l_hashmap_set_key_free_function(rule_index, l_free);
+	}
+
+	matches = l_hashmap_lookup(rule_index, &key);
+	if (matches)
+		return matches;
+
+	matches = l_queue_new();
+
+	for (entry = l_queue_get_entries(rules); entry; entry = entry->next) {
+		struct hwsim_rule *rule = entry->data;
+
+		/* A disabled rule ends the processing of the rules */
+		if (!rule->enabled)
+			break;
+
+		if (!rule_match_radios(rule, src_radio, dst_radio))
+			continue;
+
+		if (rule->frequency && rule->frequency != frequency)
+			continue;
+
+		l_queue_push_tail(matches, rule);
+	}
+
+	l_hashmap_insert(rule_index, &key, matches);
+
+	return matches;
+}
+
 static void radio_free(void *user_data)
 {
 	struct radio_info_rec *rec = user_data;
 
+	/* The rule index may hold a pointer to this radio */
+	rule_index_flush();
+
 	if (rec->cmd_id)
 		l_genl_family_cancel(nl80211, rec->cmd_id);
 
@@ -1182,59 +1345,19 @@ struct hwsim_frame {
 	int pending_callback_count;
 };
 
-static bool radio_match_addr(const struct radio_info_rec *radio,
-				const uint8_t *addr)
-{
-	if (!radio || util_is_broadcast_address(addr))
-		return !radio && util_is_broadcast_address(addr);
-
-	return !memcmp(addr, radio->addrs[0], ETH_ALEN) ||
-		!memcmp(addr, radio->addrs[1], ETH_ALEN);
-}
-
 static void process_rules(const struct radio_info_rec *src_radio,
 				const struct radio_info_rec *dst_radio,
 				struct hwsim_frame *frame, bool ack, bool *drop,
 				uint32_t *delay)
 {
 	const struct l_queue_entry *rule_entry;
+	struct l_queue *matches = rule_index_lookup(src_radio, dst_radio,
+							frame->frequency);
 
-	for (rule_entry = l_queue_get_entries(rules); rule_entry;
+	for (rule_entry = l_queue_get_entries(matches); rule_entry;
 			rule_entry = rule_entry->next) {
 		struct hwsim_rule *rule = rule_entry->data;
 
-		if (!rule->enabled)
-			return;
-
-		if (!rule->source_any &&
-				!radio_match_addr(src_radio, rule->source) &&
-				(!rule->bidirectional ||
-				 !radio_match_addr(dst_radio, rule->source)))
-			continue;
-
-		if (!rule->destination_any &&
-				!radio_match_addr(dst_radio,
-							rule->destination) &&
-				(!rule->bidirectional ||
-				 !radio_match_addr(src_radio,
-							rule->destination)))
-			continue;
-
-		/*
-		 * If source matches only because rule->bidirectional was
-		 * true, make sure destination is "any" or matches source
-		 * radio's address.
-		 */
-		if (!rule->source_any && rule->bidirectional &&
-				radio_match_addr(dst_radio, rule->source))
-			if (!rule->destination_any &&
-					!radio_match_addr(dst_radio,
-							rule->destination))
-				continue;
-
-		if (rule->frequency && rule->frequency != frame->frequency)
-			continue;
-
 		if (rule->prefix && frame->payload_len >= rule->prefix_len) {
 			if (memcmp(rule->prefix, frame->payload,
 					rule->prefix_len) != 0)
@@ -1253,16 +1376,26 @@ static void process_rules(const struct radio_info_rec *src_radio,
 		if (rule->match_times == 0)
 			continue;
 
+		rule->matched++;
+
 		if (rule->signal)
 			frame->signal = rule->signal / 100;
 
 		/* Don't drop if this is an ACK, unless drop_ack is set */
-		if (!ack || (ack && rule->drop_ack))
+		if (!ack || (ack && rule->drop_ack)) {
 			*drop = rule->drop;
 
-		if (delay)
+			if (rule->drop)
+				rule->dropped++;
+		}
+
+		if (delay) {
 			*delay = rule->delay;
 
+			if (rule->delay)
+				rule->delayed++;
+		}
+
 		if (rule->match_times > 0)
 			rule->match_times--;
 	}
@@ -2035,60 +2168,66 @@ static int rule_compare_priority(const void *a, const void *b, void *user)
 	return (rule_a->priority > rule_b->priority) ? 1 : -1;
 }
 
-static struct l_dbus_message *rule_add(struct l_dbus *dbus,
-					struct l_dbus_message *message,
-					void *user_data)
+static void rule_trajectory_stop(struct hwsim_rule *rule)
 {
-	struct hwsim_rule *rule;
-	const char *path;
-	struct l_dbus_message *reply;
+	l_timeout_remove(rule->trajectory_timeout);
+	rule->trajectory_timeout = NULL;
 
-	rule = l_new(struct hwsim_rule, 1);
-	rule->id = next_rule_id++;
-	rule->source_any = true;
-	rule->destination_any = true;
-	rule->delay = 0;
-	rule->enabled = false;
-	rule->match_times = -1;
-	rule->drop_ack = true;
+	l_free(rule->trajectory);
+	rule->trajectory = NULL;
+	rule->trajectory_len = 0;
+	rule->trajectory_pos = 0;
+}
 
-	if (!rules)
-		rules = l_queue_new();
+static void rule_trajectory_timeout(struct l_timeout *timeout,
+					void *user_data);
 
-	l_queue_insert(rules, rule, rule_compare_priority, NULL);
-	path = rule_get_path(rule);
+/*
+ * Applies all steps of the signal trajectory which are due and schedules
+ * the next one. Steps are timed from the start of the trajectory rather
+ * than from the previous step so that timer latency doesn't add up.
+ */
+static void rule_trajectory_next(struct hwsim_rule *rule)
+{
+	uint64_t elapsed = (l_time_now() - rule->trajectory_start) / 1000;
+	const char *path = rule_get_path(rule);
+	int signal = rule->signal;
+	uint32_t next;
 
-	if (!l_dbus_object_add_interface(dbus, path,
-					HWSIM_RULE_INTERFACE, rule))
-		l_info("Unable to add the %s interface to %s",
-				HWSIM_RULE_INTERFACE, path);
+	while (rule->trajectory_pos < rule->trajectory_len &&
+			rule->trajectory[rule->trajectory_pos].time <= elapsed)
+		rule->signal = rule->trajectory[rule->trajectory_pos++].signal;
 
-	if (!l_dbus_object_add_interface(dbus, path,
-					L_DBUS_INTERFACE_PROPERTIES, NULL))
-		l_info("Unable to add the %s interface to %s",
-				L_DBUS_INTERFACE_PROPERTIES, path);
+	if (rule->signal != signal)
+		l_dbus_property_changed(dbus, path, HWSIM_RULE_INTERFACE,
+						"SignalStrength");
 
-	reply = l_dbus_message_new_method_return(message);
-	l_dbus_message_set_arguments(reply, "o", path);
+	if (rule->trajectory_pos == rule->trajectory_len) {
+		rule_trajectory_stop(rule);
+		l_dbus_property_changed(dbus, path, HWSIM_RULE_INTERFACE,
+						"SignalTrajectoryActive");
+		return;
+	}
 
-	return reply;
+	next = rule->trajectory[rule->trajectory_pos].time - elapsed;
+
+	if (rule->trajectory_timeout)
+		l_timeout_modify_ms(rule->trajectory_timeout, next);
+	else
+		rule->trajectory_timeout = l_timeout_create_ms(next,
+						rule_trajectory_timeout,
+						rule, NULL);
 }
 
-static void setup_rule_manager_interface(struct l_dbus_interface *interface)
+static void rule_trajectory_timeout(struct l_timeout *timeout,
+					void *user_data)
 {
-	l_dbus_interface_method(interface, "AddRule", 0,
-				rule_add, "o", "", "path");
+	rule_trajectory_next(user_data);
 }
 
-static struct l_dbus_message *rule_remove(struct l_dbus *dbus,
-						struct l_dbus_message *message,
-						void *user_data)
+static void rule_free(struct hwsim_rule *rule)
 {
-	struct hwsim_rule *rule = user_data;
-	const char *path;
-
-	path = rule_get_path(rule);
-	l_queue_remove(rules, rule);
+	rule_trajectory_stop(rule);
 
 	if (rule->prefix)
 		l_free(rule->prefix);
@@ -2097,6 +2236,19 @@ static struct l_dbus_message *rule_remove(struct l_dbus *dbus,
 		l_free(rule->match);
 
 	l_free(rule);
+}
+
+static struct l_dbus_message *rule_remove(struct l_dbus *dbus,
+						struct l_dbus_message *message,
+						void *user_data)
+{
+	struct hwsim_rule *rule = user_data;
+	const char *path;
+
+	path = rule_get_path(rule);
+	l_queue_remove(rules, rule);
+	rule_index_flush();
+	rule_free(rule);
 	l_dbus_unregister_object(dbus, path);
 
 	return l_dbus_message_new_method_return(message);
@@ -2141,6 +2293,8 @@ static struct l_dbus_message *rule_property_set_source(struct l_dbus *dbus,
 		rule->source_any = false;
 	}
 
+	rule_index_flush();
+
 	return l_dbus_message_new_method_return(message);
 }
 
@@ -2189,6 +2343,8 @@ static struct l_dbus_message *rule_property_set_destination(
 		rule->destination_any = false;
 	}
 
+	rule_index_flush();
+
 	return l_dbus_message_new_method_return(message);
 }
 
@@ -2219,6 +2375,7 @@ static struct l_dbus_message *rule_property_set_bidirectional(
 		return dbus_error_invalid_args(message);
 
 	rule->bidirectional = bval;
+	rule_index_flush();
 
 	return l_dbus_message_new_method_return(message);
 }
@@ -2246,6 +2403,8 @@ static struct l_dbus_message *rule_property_set_frequency(struct l_dbus *dbus,
 	if (!l_dbus_message_iter_get_variant(new_value, "u", &rule->frequency))
 		return dbus_error_invalid_args(message);
 
+	rule_index_flush();
+
 	return l_dbus_message_new_method_return(message);
 }
 
@@ -2277,6 +2436,7 @@ static struct l_dbus_message *rule_property_set_priority(struct l_dbus *dbus,
 	rule->priority = intval;
 	l_queue_remove(rules, rule);
 	l_queue_insert(rules, rule, rule_compare_priority, NULL);
+	rule_index_flush();
 
 	return l_dbus_message_new_method_return(message);
 }
@@ -2307,6 +2467,14 @@ static struct l_dbus_message *rule_property_set_signal(struct l_dbus *dbus,
 			intval > 0 || intval < -10000)
 		return dbus_error_invalid_args(message);
 
+	/* Setting the signal directly overrides any trajectory */
+	if (rule->trajectory) {
+		rule_trajectory_stop(rule);
+		l_dbus_property_changed(dbus, rule_get_path(rule),
+						HWSIM_RULE_INTERFACE,
+						"SignalTrajectoryActive");
+	}
+
 	rule->signal = intval;
 
 	return l_dbus_message_new_method_return(message);
@@ -2538,6 +2706,7 @@ static struct l_dbus_message *rule_property_set_enabled(
 		return dbus_error_invalid_args(message);
 
 	rule->enabled = bval;
+	rule_index_flush();
 
 	return l_dbus_message_new_method_return(message);
 }
@@ -2604,9 +2773,250 @@ static struct l_dbus_message *rule_property_set_drop_ack(
 	return l_dbus_message_new_method_return(message);
 }
 
+static const struct {
+	const char *name;
+	struct l_dbus_message *(*set)(struct l_dbus *dbus,
+					struct l_dbus_message *message,
+					struct l_dbus_message_iter *new_value,
+					l_dbus_property_complete_cb_t complete,
+					void *user_data);
+} rule_setters[] = {
+	{ "Source", rule_property_set_source },
+	{ "Destination", rule_property_set_destination },
+	{ "Bidirectional", rule_property_set_bidirectional },
+	{ "Frequency", rule_property_set_frequency },
+	{ "Priority", rule_property_set_priority },
+	{ "SignalStrength", rule_property_set_signal },
+	{ "Drop", rule_property_set_drop },
+	{ "Delay", rule_property_set_delay },
+	{ "Prefix", rule_property_set_prefix },
+	{ "MatchBytes", rule_property_set_match },
+	{ "MatchBytesOffset", rule_property_set_match_offset },
+	{ "Enabled", rule_property_set_enabled },
+	{ "MatchTimes", rule_property_set_match_times },
+	{ "DropAck", rule_property_set_drop_ack },
+	{ }
+};
+
+/*
+ * Sets the rule properties in the a{sv} argument of 'message' using the
+ * same setters as Properties.Set. Returns NULL on success or the error
+ * reply for the first invalid property, in which case the properties
+ * before it have already been set. PropertiesChanged is only emitted if
+ * 'emit' is set, i.e. if the rule is already on the bus.
+ */
+static struct l_dbus_message *rule_set_properties(struct l_dbus *dbus,
+						struct l_dbus_message *message,
+						struct hwsim_rule *rule,
+						bool emit)
+{
+	struct l_dbus_message_iter dict;
+	struct l_dbus_message_iter variant;
+	const char *key;
+
+	if (!l_dbus_message_get_arguments(message, "a{sv}", &dict))
+		return dbus_error_invalid_args(message);
+
+	while (l_dbus_message_iter_next_entry(&dict, &key, &variant)) {
+		struct l_dbus_message *reply;
+		unsigned int i;
+
+		for (i = 0; rule_setters[i].name; i++)
+			if (!strcmp(rule_setters[i].name, key))
+				break;
+
+		if (!rule_setters[i].name)
+			return dbus_error_invalid_args(message);
+
+		reply = rule_setters[i].set(dbus, message, &variant, NULL,
+						rule);
+		if (l_dbus_message_is_error(reply))
+			return reply;
+
+		l_dbus_message_unref(reply);
+
+		if (emit)
+			l_dbus_property_changed(dbus, rule_get_path(rule),
+						HWSIM_RULE_INTERFACE, key);
+	}
+
+	return NULL;
+}
+
+static struct l_dbus_message *rule_add(struct l_dbus *dbus,
+					struct l_dbus_message *message,
+					void *user_data)
+{
+	struct hwsim_rule *rule;
+	const char *path;
+	struct l_dbus_message *reply;
+
+	rule = l_new(struct hwsim_rule, 1);
+	rule->id = next_rule_id;
+	rule->source_any = true;
+	rule->destination_any = true;
+	rule->delay = 0;
+	rule->enabled = false;
+	rule->match_times = -1;
+	rule->drop_ack = true;
+
+	if (!rules)
+		rules = l_queue_new();
+
+	/*
+	 * The rule is configured before it is added to the bus and before
+	 * it can match any frames, setting Priority inserts it into rules
+	 */
+	reply = rule_set_properties(dbus, message, rule, false);
+	if (reply) {
+		l_queue_remove(rules, rule);
+		rule_index_flush();
+		rule_free(rule);
+		return reply;
+	}
+
+	next_rule_id++;
+	l_queue_remove(rules, rule);
+	l_queue_insert(rules, rule, rule_compare_priority, NULL);
+	rule_index_flush();
+	path = rule_get_path(rule);
+
+	if (!l_dbus_object_add_interface(dbus, path,
+					HWSIM_RULE_INTERFACE, rule))
+		l_info("Unable to add the %s interface to %s",
+				HWSIM_RULE_INTERFACE, path);
+
+	if (!l_dbus_object_add_interface(dbus, path,
+					L_DBUS_INTERFACE_PROPERTIES, NULL))
+		l_info("Unable to add the %s interface to %s",
+				L_DBUS_INTERFACE_PROPERTIES, path);
+
+	reply = l_dbus_message_new_method_return(message);
+	l_dbus_message_set_arguments(reply, "o", path);
+
+	return reply;
+}
+
+static void setup_rule_manager_interface(struct l_dbus_interface *interface)
+{
+	l_dbus_interface_method(interface, "AddRule", 0,
+				rule_add, "o", "a{sv}", "path", "properties");
+}
+
+static struct l_dbus_message *rule_set_signal_trajectory(
+						struct l_dbus *dbus,
+						struct l_dbus_message *message,
+						void *user_data)
+{
+	struct hwsim_rule *rule = user_data;
+	struct l_dbus_message_iter steps;
+	struct signal_step step;
+	struct signal_step *trajectory = NULL;
+	unsigned int len = 0;
+	bool was_active = rule->trajectory != NULL;
+
+	if (!l_dbus_message_get_arguments(message, "a(un)", &steps))
+		return dbus_error_invalid_args(message);
+
+	while (l_dbus_message_iter_next_entry(&steps, &step.time,
+						&step.signal)) {
+		if (step.signal > 0 || step.signal < -10000 ||
+				len == HWSIM_MAX_TRAJECTORY_LEN ||
+				(len && step.time < trajectory[len - 1].time)) {
+			l_free(trajectory);
+			return dbus_error_invalid_args(message);
+		}
+
+		trajectory = l_realloc(trajectory, (len + 1) * sizeof(step));
+		trajectory[len++] = step;
+	}
+
+	rule_trajectory_stop(rule);
+
+	if (len) {
+		rule->trajectory = trajectory;
+		rule->trajectory_len = len;
+		rule->trajectory_start = l_time_now();
+		rule_trajectory_next(rule);
+	} else if (was_active)
+		l_dbus_property_changed(dbus, rule_get_path(rule),
+						HWSIM_RULE_INTERFACE,
+						"SignalTrajectoryActive");
+
+	return l_dbus_message_new_method_return(message);
+}
+
+static bool rule_property_get_trajectory_active(struct l_dbus *dbus,
+					struct l_dbus_message *message,
+					struct l_dbus_message_builder *builder,
+					void *user_data)
+{
+	struct hwsim_rule *rule = user_data;
+	bool bval = rule->trajectory != NULL;
+
+	l_dbus_message_builder_append_basic(builder, 'b', &bval);
+
+	return true;
+}
+
+static bool rule_property_get_match_count(struct l_dbus *dbus,
+					struct l_dbus_message *message,
+					struct l_dbus_message_builder *builder,
+					void *user_data)
+{
+	struct hwsim_rule *rule = user_data;
+
+	l_dbus_message_builder_append_basic(builder, 'u', &rule->matched);
+
+	return true;
+}
+
+static bool rule_property_get_drop_count(struct l_dbus *dbus,
+					struct l_dbus_message *message,
+					struct l_dbus_message_builder *builder,
+					void *user_data)
+{
+	struct hwsim_rule *rule = user_data;
+
+	l_dbus_message_builder_append_basic(builder, 'u', &rule->dropped);
+
+	return true;
+}
+
+static bool rule_property_get_delay_count(struct l_dbus *dbus,
+					struct l_dbus_message *message,
+					struct l_dbus_message_builder *builder,
+					void *user_data)
+{
+	struct hwsim_rule *rule = user_data;
+
+	l_dbus_message_builder_append_basic(builder, 'u', &rule->delayed);
+
+	return true;
+}
+
+static struct l_dbus_message *rule_update(struct l_dbus *dbus,
+						struct l_dbus_message *message,
+						void *user_data)
+{
+	struct hwsim_rule *rule = user_data;
+	struct l_dbus_message *reply;
+
+	reply = rule_set_properties(dbus, message, rule, true);
+	if (reply)
+		return reply;
+
+	return l_dbus_message_new_method_return(message);
+}
+
 static void setup_rule_interface(struct l_dbus_interface *interface)
 {
 	l_dbus_interface_method(interface, "Remove", 0, rule_remove, "", "");
+	l_dbus_interface_method(interface, "Update", 0, rule_update, "",
+					"a{sv}", "properties");
+	l_dbus_interface_method(interface, "SetSignalTrajectory", 0,
+					rule_set_signal_trajectory, "",
+					"a(un)", "steps");
 
 	l_dbus_interface_property(interface, "Source",
 					L_DBUS_PROPERTY_FLAG_AUTO_EMIT, "s",
@@ -2664,6 +3074,15 @@ static void setup_rule_interface(struct l_dbus_interface *interface)
 					L_DBUS_PROPERTY_FLAG_AUTO_EMIT, "b",
 					rule_property_get_drop_ack,
 					rule_property_set_drop_ack);
+	l_dbus_interface_property(interface, "SignalTrajectoryActive", 0, "b",
+					rule_property_get_trajectory_active,
+					NULL);
+	l_dbus_interface_property(interface, "MatchCount", 0, "u",
+					rule_property_get_match_count, NULL);
+	l_dbus_interface_property(interface, "DropCount", 0, "u",
+					rule_property_get_drop_count, NULL);
+	l_dbus_interface_property(interface, "DelayCount", 0, "u",
+					rule_property_get_delay_count, NULL);
 }
 
 static void request_name_callback(struct l_dbus *dbus, bool success,
@@ -5,11 +5,21 @@ from configparser import ConfigParser
 from collections import namedtuple
 from shutil import copy, copytree, which, rmtree
 from glob import glob
+from prettytable import PrettyTable
+from termcolor import colored
 
 import os
 import ctypes
 import fcntl
 import sys
+import copy as pycopy
+import json
+import math
+import subprocess
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
 
 libc = ctypes.cdll['libc.so.6']
 libc.mount.argtypes = (ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, \
@@ -20,12 +30,22 @@ libc.mount.argtypes = (ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, \
 MS_NOSUID = 2
 MS_NODEV = 4
 MS_NOEXEC = 8
+MS_BIND = 4096
 MS_STRICTATIME = 1 << 24
 STDIN_FILENO = 0
 TIOCSTTY = 0x540E
 
+TEST_MAX_TIMEOUT = 240
+
+# Written by autotests/util/benchmark.py, collected after each scenario
+BENCHMARK_SAMPLES = '/tmp/benchmark-samples'
+
 MountInfo = namedtuple('MountInfo', 'fstype source target options flags')
 DevInfo = namedtuple('DevInfo', 'target linkpath')
+SimpleResult = namedtuple('SimpleResult', 'run failures errors skipped time')
+# status is one of 'passed', 'failure', 'error' or 'skipped'
+SubtestResult = namedtuple('SubtestResult', 'test subtest status time traceback')
+SubtestStart = namedtuple('SubtestStart', 'test subtest')
 
 mounts_common = [
 	MountInfo('sysfs', 'sysfs', '/sys', '', MS_NOSUID|MS_NOEXEC|MS_NODEV),
@@ -58,6 +78,440 @@ def mount(source, target, fs, flags, options=''):
 		errno = ctypes.get_errno()
 		raise Exception("Could not mount %s (%d)" % (target, errno))
 
+def print_results(results):
+	table = PrettyTable(['Test', colored('Passed', 'green'), colored('Failed', 'red'), \
+				colored('Skipped', 'cyan'), colored('Time', 'yellow')])
+
+	total_pass = 0
+	total_fail = 0
+	total_skip = 0
+	total_time = 0
+
+	for test, result in results.items():
+
+		if result.time == TEST_MAX_TIMEOUT:
+			failed = "Timed out"
+			passed = "Timed out"
+		elif result.time == 0:
+			failed = "Exception"
+			passed = "Exception"
+		else:
+			failed = result.failures + result.errors
+			passed = result.run - failed
+
+			total_pass += passed
+			total_fail += failed
+			total_skip += result.skipped
+
+		total_time += result.time
+
+		time = '%.2f' % result.time
+
+		table.add_row([test, colored(passed, 'green'), colored(failed, 'red'), \
+				colored(result.skipped, 'cyan'), colored(time, 'yellow')])
+
+	total_time = '%.2f' % total_time
+
+	table.add_row(['Total', colored(total_pass, 'green'), colored(total_fail, 'red'), \
+			colored(total_skip, 'cyan'), colored(total_time, 'yellow')])
+
+	print(table, file=sys.__stdout__)
+
+	return total_fail == 0
+
+class ResultReport:
+	'''
+		Writes per subtest results to a file as each one comes in, as
+		JSON Lines or JUnit XML. The JUnit file is rewritten (atomically)
+		after every result so that it is valid even if the run does not
+		finish.
+	'''
+	def __init__(self, path, format=None):
+		self.path = path
+		self.format = format
+
+		if not self.format:
+			self.format = 'junit' if path.endswith('.xml') else 'jsonl'
+
+		self.results = []
+
+		# Start from an empty file for each run
+		open(path, 'w').close()
+
+	@staticmethod
+	def read(path):
+		'''
+			Returns the results from a JSON Lines report
+		'''
+		with open(path, 'r') as f:
+			return [SubtestResult(**json.loads(l)) for l in f if l.strip()]
+
+	def add(self, result):
+		self.results.append(result)
+
+		if self.format == 'jsonl':
+			with open(self.path, 'a') as f:
+				f.write(json.dumps(result._asdict()) + '\n')
+		else:
+			self._write_junit()
+
+	def extend(self, results):
+		for r in results:
+			self.add(r)
+
+	def _write_junit(self):
+		root = ET.Element('testsuites')
+		suites = {}
+
+		for r in self.results:
+			if r.test not in suites:
+				suites[r.test] = ET.SubElement(root, 'testsuite', name=r.test)
+
+			suite = suites[r.test]
+			module, func = r.subtest.rsplit('.', 1)
+
+			case = ET.SubElement(suite, 'testcase', classname='%s.%s' %
+						(r.test, module), name=func,
+						time='%.3f' % r.time)
+
+			if r.status == 'skipped':
+				ET.SubElement(case, 'skipped')
+			elif r.status in ['failure', 'error']:
+				e = ET.SubElement(case, r.status,
+						message='%s %s' % (r.subtest, r.status))
+				e.text = r.traceback
+
+		for name, suite in suites.items():
+			results = [r for r in self.results if r.test == name]
+
+			suite.set('tests', str(len(results)))
+			for attr, status in [('failures', 'failure'), ('errors', 'error'),
+						('skipped', 'skipped')]:
+				suite.set(attr, str(len([r for r in results
+							if r.status == status])))
+			suite.set('time', '%.3f' % sum([r.time for r in results]))
+
+		tmp = self.path + '.tmp'
+		ET.ElementTree(root).write(tmp, encoding='utf-8', xml_declaration=True)
+		os.replace(tmp, self.path)
+
+class TimingDatabase:
+	'''
+		Per-test durations kept across runs, stored as JSON. Each entry
+		is a moving average of the test directories run time which is
+		used to order tests (longest first) or to split them into shards
+		of roughly equal length.
+	'''
+	def __init__(self, path):
+		self.path = path
+		self.times = {}
+
+		if not path or not os.path.exists(path):
+			return
+
+		try:
+			with open(path, 'r') as f:
+				self.times = json.load(f)
+		except Exception as e:
+			print("Could not load timing database %s: %s" % (path, str(e)))
+
+	def _estimate(self, test):
+		test = os.path.basename(test)
+
+		if test in self.times:
+			return self.times[test]
+
+		# Unknown tests are assumed to take an average amount of time
+		if self.times:
+			return sum(self.times.values()) / len(self.times)
+
+		return 0
+
+	def update(self, results):
+		for test, result in results.items():
+			# No meaningful duration for tests which threw an exception
+			if result.time == 0:
+				continue
+
+			if test in self.times:
+				self.times[test] = (self.times[test] + result.time) / 2
+			else:
+				self.times[test] = result.time
+
+	def save(self):
+		if not self.path:
+			return
+
+		tmp = self.path + '.tmp'
+
+		with open(tmp, 'w') as f:
+			json.dump(self.times, f, indent=1, sort_keys=True)
+
+		os.replace(tmp, self.path)
+
+	def longest_first(self, tests):
+		return sorted(tests, key=lambda t: (-self._estimate(t), t))
+
+	def shard(self, tests, index, count):
+		'''
+			Split 'tests' into 'count' shards of roughly equal total
+			run time (greedy, longest test to the shortest shard) and
+			return shard 'index' (1 based).
+		'''
+		if index < 1 or index > count:
+			raise Exception("Invalid shard %u/%u" % (index, count))
+
+		shards = [[] for i in range(count)]
+		totals = [0] * count
+
+		for test in self.longest_first(tests):
+			i = totals.index(min(totals))
+			shards[i].append(test)
+			totals[i] += self._estimate(test)
+
+		return sorted(shards[index - 1])
+
+class CoverageMap:
+	'''
+		Maps source files to the autotest directories which execute them,
+		stored as JSON. Generated from gcov data (--gcov) and used to
+		select the tests affected by a change (--changed-since). Every
+		source file gcov knows about has an entry, possibly an empty list,
+		so that files missing from the map can be told apart.
+	'''
+	# Changes to these never affect the autotests
+	ignored = ['doc/', 'unit/', 'AUTHORS', 'COPYING', 'ChangeLog', 'HACKING',
+			'INSTALL', 'README', 'TODO']
+
+	def __init__(self, path):
+		self.path = path
+		self.map = {}
+
+		if not path or not os.path.exists(path):
+			return
+
+		with open(path, 'r') as f:
+			self.map = json.load(f)
+
+	def _remove_test(self, test):
+		for tests in self.map.values():
+			if test in tests:
+				tests.remove(test)
+
+	def update(self, test, sources, executed):
+		'''
+			Replace the entries for 'test', which executed code in
+			'executed' out of all 'sources' built with coverage.
+		'''
+		self._remove_test(test)
+
+		for source in sources:
+			self.map.setdefault(source, [])
+
+		for source in executed:
+			self.map[source].append(test)
+			self.map[source].sort()
+
+	def merge(self, other):
+		tests = set([t for tests in other.map.values() for t in tests])
+
+		for test in tests:
+			self._remove_test(test)
+
+		for source, tests in other.map.items():
+			self.map[source] = sorted(set(self.map.get(source, []) + tests))
+
+	def save(self):
+		tmp = self.path + '.tmp'
+
+		with open(tmp, 'w') as f:
+			json.dump(self.map, f, indent=1, sort_keys=True)
+
+		os.replace(tmp, self.path)
+
+	def tests_for(self, files, util_tests):
+		'''
+			Returns the set of tests affected by changes to 'files' or
+			None if the tests can't be narrowed down and all should run.
+			'util_tests' maps autotests/util modules to the tests which
+			import them.
+		'''
+		tests = set()
+
+		for f in files:
+			parts = f.split('/')
+
+			if any([f.startswith(i) for i in self.ignored]):
+				continue
+
+			if parts[0] == 'autotests' and parts[1].startswith('test'):
+				tests.add(parts[1])
+			elif parts[0] == 'autotests' and parts[1] == 'util' and \
+						f.endswith('.py'):
+				module = os.path.splitext(parts[-1])[0]
+				tests.update(util_tests.get(module, []))
+			elif f in self.map:
+				tests.update(self.map[f])
+			else:
+				print("No coverage data for %s, running all tests" % f)
+				return None
+
+		return tests
+
+class BenchmarkResults:
+	'''
+		Latency samples of the benchmark scenarios (--benchmark) keyed by
+		'<scenario>/<metric>' along with their percentiles, in seconds.
+		Saved as JSON so that a later run can be compared against it.
+	'''
+	percentiles = [50, 95, 99]
+
+	def __init__(self, path=None):
+		self.path = path
+		self.results = {}
+
+		if not path or not os.path.exists(path):
+			return
+
+		with open(path, 'r') as f:
+			self.results = json.load(f)
+
+	@staticmethod
+	def percentile(samples, p):
+		# Nearest rank, so the result is always an actual sample
+		ordered = sorted(samples)
+
+		return ordered[max(0, math.ceil(p * len(ordered) / 100) - 1)]
+
+	def add(self, scenario, metric, samples, histogram=False):
+		key = '%s/%s' % (scenario, metric)
+		entry = self.results.setdefault(key, { 'samples': [] })
+
+		entry['samples'].extend(samples)
+
+		if histogram:
+			entry['histogram'] = True
+
+		if not entry['samples']:
+			return
+
+		entry['count'] = len(entry['samples'])
+		entry['min'] = min(entry['samples'])
+		entry['max'] = max(entry['samples'])
+
+		for p in self.percentiles:
+			entry['p%u' % p] = self.percentile(entry['samples'], p)
+
+	def read_samples(self, path):
+		'''
+			Adds the samples written by autotests/util/benchmark.py, one
+			JSON object per line, and removes the file.
+		'''
+		if not os.path.exists(path):
+			return
+
+		with open(path, 'r') as f:
+			for line in f:
+				sample = json.loads(line)
+				self.add(sample['scenario'], sample['metric'],
+						sample['samples'],
+						sample.get('histogram', False))
+
+		os.remove(path)
+
+	def regressions(self, baseline, tolerance):
+		'''
+			Returns the keys for which p50 or p95 is more than
+			'tolerance' percent above 'baseline'
+		'''
+		regressed = []
+
+		for key, entry in self.results.items():
+			base = baseline.results.get(key)
+
+			if not base or 'count' not in entry or 'count' not in base:
+				continue
+
+			for p in ['p50', 'p95']:
+				if entry[p] > base[p] * (1 + tolerance / 100):
+					regressed.append(key)
+					break
+
+		return sorted(regressed)
+
+	def histogram(self, key, buckets=10, width=40):
+		'''
+			Text histogram of the samples of 'key' in 'buckets' equally
+			sized latency ranges between the minimum and the maximum
+		'''
+		entry = self.results[key]
+		low = entry['min']
+		size = (entry['max'] - low) / buckets
+
+		if size == 0:
+			buckets = 1
+			size = 0.001
+
+		counts = [0] * buckets
+
+		for sample in entry['samples']:
+			counts[min(int((sample - low) / size), buckets - 1)] += 1
+
+		lines = ['%s (ms)' % key]
+
+		for i, count in enumerate(counts):
+			bar = '#' * math.ceil(count * width / max(counts))
+			lines.append('%9.1f - %9.1f | %-*s %u' %
+					((low + i * size) * 1000,
+					(low + (i + 1) * size) * 1000,
+					width, bar, count))
+
+		return '\n'.join(lines)
+
+	def print(self, baseline=None):
+		columns = ['Benchmark', 'Runs'] + \
+				['p%u (ms)' % p for p in self.percentiles]
+		if baseline:
+			columns += ['p50 change', 'p95 change']
+
+		table = PrettyTable(columns)
+
+		for key, entry in sorted(self.results.items()):
+			if 'count' not in entry:
+				continue
+
+			row = [key, entry['count']]
+			row += ['%.1f' % (entry['p%u' % p] * 1000)
+						for p in self.percentiles]
+
+			if baseline:
+				base = baseline.results.get(key, {})
+
+				for p in ['p50', 'p95']:
+					if base.get(p):
+						row.append('%+.1f%%' % ((entry[p] / base[p] - 1) * 100))
+					else:
+						row.append('-')
+
+			table.add_row(row)
+
+		print(table, file=sys.__stdout__)
+
+		for key, entry in sorted(self.results.items()):
+			if 'count' in entry and entry.get('histogram'):
+				print('\n' + self.histogram(key), file=sys.__stdout__)
+
+	def save(self):
+		if not self.path:
+			return
+
+		tmp = self.path + '.tmp'
+
+		with open(tmp, 'w') as f:
+			json.dump(self.results, f, indent=1, sort_keys=True)
+
+		os.replace(tmp, self.path)
+
 #
 # Custom argparse.Namespace class to stringify arguments in a way that can be
 # directly passed to the test environment as kernel arguments. This also removes
@@ -80,6 +534,23 @@ class RunnerNamespace(Namespace):
 
 		return ret.strip()
 
+	#
+	# Same as to_cmd() but as a dictionary suitable for use as the environment
+	# of the test process, for when no kernel command line is involved.
+	#
+	def to_env(self):
+		ret = {}
+		for k, v in self.__dict__.items():
+			if v in [None, False, [], '']:
+				continue
+
+			if type(v) is list:
+				ret[k] = ','.join(v)
+			else:
+				ret[k] = str(v)
+
+		return ret
+
 #
 # The core arguments needed both inside and outside the test environment
 #
@@ -117,9 +588,129 @@ class RunnerCoreArgParse(ArgumentParser):
 		self.add_argument('--hw', '-w',
 				type=str,
 				help='Use physical adapters for tests (passthrough)')
+		self.add_argument('--reuse-radios',
+				action='store_true',
+				help='Keep hwsim radios between tests instead of '
+					'recreating them for each test',
+				dest='reuse_radios')
+		self.add_argument('--timings', '-t',
+				type=os.path.abspath,
+				help='Database of per-test run times, updated after each run')
+		self.add_argument('--import-budget',
+				metavar='<seconds>',
+				type=float,
+				help='Report the slowest imports if loading the test '
+					'modules takes longer than this',
+				dest='import_budget',
+				default=1.0)
+		self.add_argument('--schedule',
+				metavar='<order>',
+				choices=['name', 'longest'],
+				help='Order to run tests in (name, longest)',
+				dest='schedule',
+				default='name')
+		self.add_argument('--shard',
+				metavar='<index>/<count>',
+				type=str,
+				help='Only run shard <index> of <count> equal length shards',
+				dest='shard')
 		self.add_argument('--testhome', help=SUPPRESS)
 		self.add_argument('--monitor-parent', help=SUPPRESS)
 		self.add_argument('--result-parent', help=SUPPRESS)
+		self.add_argument('--timings-parent', help=SUPPRESS)
+		self.add_argument('--resources',
+				metavar='<file>',
+				type=os.path.abspath,
+				help='Append per test/subtest process resource usage '
+					'to <file> (JSON Lines)')
+		self.add_argument('--resources-parent', help=SUPPRESS)
+		self.add_argument('--report',
+				metavar='<file>',
+				type=os.path.abspath,
+				help='Write each subtest result to <file> as soon as '
+					'it finishes')
+		self.add_argument('--report-format',
+				metavar='<format>',
+				choices=['jsonl', 'junit'],
+				help='Format of --report (jsonl, junit), by default '
+					'junit for *.xml and jsonl otherwise',
+				dest='report_format')
+		self.add_argument('--report-parent', help=SUPPRESS)
+		self.add_argument('--changed-since',
+				metavar='<rev>',
+				type=str,
+				help='Only run the tests affected by changes since '
+					'git revision <rev>',
+				dest='changed_since')
+		self.add_argument('--coverage-map',
+				metavar='<file>',
+				type=os.path.abspath,
+				help='Source to test map used by --changed-since '
+					'(default autotests/coverage-map.json)',
+				dest='coverage_map')
+		self.add_argument('--gcov',
+				action='store_true',
+				help='Update --coverage-map from gcov data, iwd '
+					'must be built with --coverage')
+		self.add_argument('--coverage-map-parent', help=SUPPRESS)
+		self.add_argument('--coverage-map-job', help=SUPPRESS)
+		self.add_argument('--benchmark',
+				action='store_true',
+				help='Run the benchmark scenarios (autotests/bench*) '
+					'instead of the tests')
+		self.add_argument('--bench-runs',
+				metavar='<count>',
+				type=int,
+				help='Number of times each benchmark is measured',
+				dest='bench_runs',
+				default=20)
+		self.add_argument('--bench-results',
+				metavar='<file>',
+				type=os.path.abspath,
+				help='Save benchmark results to <file>',
+				dest='bench_results')
+		self.add_argument('--bench-baseline',
+				metavar='<file>',
+				type=os.path.abspath,
+				help='Compare benchmark results against an earlier '
+					'--bench-results file',
+				dest='bench_baseline')
+		self.add_argument('--bench-tolerance',
+				metavar='<percent>',
+				type=float,
+				help='Fail if p50 or p95 is more than <percent> above '
+					'the baseline (default 20)',
+				dest='bench_tolerance',
+				default=20.0)
+		self.add_argument('--bench-results-parent', help=SUPPRESS)
+		self.add_argument('--fs',
+				metavar='<transport>',
+				choices=['9p', 'virtiofs'],
+				help='Transport for shared directories (9p, virtiofs), '
+					'QEMU only',
+				dest='fs',
+				default='9p')
+		self.add_argument('--fs-msize',
+				metavar='<bytes>',
+				type=int,
+				help='9p msize for shared directories (default 10240)',
+				dest='fs_msize')
+		self.add_argument('--fs-cache',
+				metavar='<mode>',
+				choices=['none', 'loose', 'fscache', 'mmap'],
+				help='9p cache mode for shared directories (default none)',
+				dest='fs_cache')
+		self.add_argument('--fs-stats',
+				action='store_true',
+				help='Report time spent in file I/O inside the VM',
+				dest='fs_stats')
+		self.add_argument('--daemon', '-D',
+				metavar='<dir>',
+				type=os.path.abspath,
+				help='Keep the test environment running and accept '
+					'tests through <dir>')
+		self.add_argument('--job-dir', help=SUPPRESS)
+		self.add_argument('--job-id', type=int, help=SUPPRESS)
 
 		# Prevent --autotest/--unittest from being used together
 		auto_unit_group = self.add_mutually_exclusive_group()
@@ -178,6 +769,16 @@ class RunnerArgParse(RunnerCoreArgParse):
 				help='Path to kernel/uml image',
 				dest='kernel',
 				default=None)
+		self.add_argument('--jobs', '-j',
+				metavar='<jobs>',
+				type=int,
+				help='Number of test environments to run in parallel',
+				dest='jobs',
+				default=1)
+		self.add_argument('--daemon-stop',
+				action='store_true',
+				help='Stop the test environment started with --daemon',
+				dest='daemon_stop')
 
 #
 # Class to sort out what type of runner this is, returns the RunnerAbstract
@@ -192,12 +793,28 @@ class Runner:
 		# Common options
 		args.PATH = os.environ['PATH']
 
+		#
+		# Hand the request to an already running test environment. Only
+		# on the host, inside the test environment (arguments passed
+		# through the environment) the PID in the pid file is meaningless.
+		#
+		on_host = len(sys.argv) > 1
+
+		if on_host and args.daemon and DaemonClient.is_running(args.daemon):
+			return DaemonClient(args)
+		elif args.daemon_stop:
+			raise Exception("No test environment running in %s" % args.daemon)
+
 		if 'testhome' not in args.to_cmd():
 			if os.getcwd().endswith('tools'):
 				args.testhome = '%s/../' % os.getcwd()
 			else:
 				args.testhome = os.getcwd()
 
+		if not args.coverage_map:
+			args.coverage_map = os.path.join(os.path.abspath(args.testhome),
+						'autotests', 'coverage-map.json')
+
 		# If no runner is specified but we have a kernel image assume
 		# if the kernel is executable its UML, otherwise qemu
 		if not args.runner:
@@ -210,12 +827,27 @@ class Runner:
 				args.runner = 'qemu'
 
 		if args.runner == 'uml':
-			return UmlRunner(args)
+			runner = UmlRunner
 		elif args.runner == 'qemu':
-			return QemuRunner(args)
+			runner = QemuRunner
+		elif args.runner == 'host':
+			runner = HostRunner
 		else:
 			raise Exception("Unknown runner %s" % args.runner)
 
+		# A job of a RunnerPool runs its tests itself
+		if args.jobs > 1 and not args.job_dir:
+			if args.daemon:
+				raise Exception('--jobs cannot be used with --daemon')
+
+			# Parallel jobs would skew the measurements
+			if args.benchmark:
+				raise Exception('--jobs cannot be used with --benchmark')
+
+			return RunnerPool(args, runner)
+
+		return runner(args)
+
 class RunnerAbstract:
 	cmdline = []
 	env = None
@@ -234,8 +866,13 @@ class RunnerAbstract:
 		else:
 			raise Exception("Cannot locate run-tests binary")
 
+	# Start anything the runner depends on, prior to the runner itself
+	def _pre_start(self):
+		pass
+
 	def start(self):
 		print("Starting %s" % self.name)
+		self._pre_start()
 		os.execlpe(self.cmdline[0], *self.cmdline, self.env)
 
 	def prepare_environment(self):
@@ -266,24 +903,92 @@ class RunnerAbstract:
 		if os.path.exists('/tmp/secrets'):
 			rmtree('/tmp/secrets')
 
+		start = time.time()
+
 		copytree(self.args.testhome + '/autotests/misc/certs', '/tmp/certs')
 		copytree(self.args.testhome + '/autotests/misc/secrets', '/tmp/secrets')
 		copy(self.args.testhome + '/autotests/misc/phonesim/phonesim.conf', '/tmp')
 
-		# Clear out any log files from other test runs
-		if self.args.log:
-			for f in [os.path.join(self.args.log, file) for file in os.listdir(self.args.log)]:
-				print("removing %s" % f)
+		copy_time = time.time() - start
 
-				if os.path.isdir(f):
-					rmtree(f)
-				else:
-					os.remove(f)
+		#
+		# Clear out any log files from other test runs. When running as
+		# part of a RunnerPool the host has already done this, and other
+		# jobs may be writing into the log directory by now.
+		#
+		if not self.args.job_dir:
+			self._clear_logs()
 
-		fcntl.ioctl(STDIN_FILENO, TIOCSTTY, 1)
+		try:
+			fcntl.ioctl(STDIN_FILENO, TIOCSTTY, 1)
+		except OSError:
+			# Not permitted in a user namespace (host runner)
+			pass
 
 		os.system('ip link set dev lo up')
 
+		if self.args.fs_stats:
+			self._fs_stats(copy_time)
+
+	def _fs_transport(self):
+		return 'unknown'
+
+	def _fs_stats(self, copy_time):
+		'''
+			Time how long reading the autotest sources, and writing
+			to the log directory, takes. This allows the different
+			file system transports to be compared.
+		'''
+		nfiles = 0
+		nbytes = 0
+
+		start = time.time()
+
+		for root, dirs, files in os.walk(self.args.testhome + '/autotests'):
+			for file in files:
+				with open(os.path.join(root, file), 'rb') as f:
+					nbytes += len(f.read())
+
+				nfiles += 1
+
+		read_time = time.time() - start
+
+		ret = 'File I/O (%s):\n' % self._fs_transport()
+		ret += '\tCopy certs/secrets:\t%.2fs\n' % copy_time
+		ret += '\tRead %u files (%u kB):\t%.2fs\n' % (nfiles, nbytes / 1024,
+								read_time)
+
+		if self.args.log:
+			path = os.path.join(self.args.log, '.fs-stats')
+			data = b'\0' * 4096
+
+			start = time.time()
+
+			with open(path, 'wb') as f:
+				for i in range(1024):
+					f.write(data)
+					f.flush()
+
+				os.fsync(f.fileno())
+
+			ret += '\tWrite 4096 kB to log:\t%.2fs\n' % (time.time() - start)
+
+			os.remove(path)
+
+		print(ret, file=sys.__stdout__)
+
+	def _clear_logs(self):
+		if not self.args.log:
+			return
+
+		for f in [os.path.join(self.args.log, file) for file in os.listdir(self.args.log)]:
+			print("removing %s" % f)
+
+			if os.path.isdir(f):
+				rmtree(f)
+			else:
+				os.remove(f)
+
 	def cleanup_environment(self):
 		rmtree('/tmp/iwd')
 		rmtree('/tmp/certs')
@@ -292,8 +997,12 @@ class RunnerAbstract:
 
 		os.sync()
 
-	# For QEMU/UML runners
-	def _prepare_mounts(self, extra=[]):
+	#
+	# For QEMU/UML/host runners. The host runner mounts over the host's own
+	# root file system, which must not be modified, so missing mount targets
+	# are only created inside a VM.
+	#
+	def _prepare_mounts(self, extra=[], create=True):
 		mounted = []
 
 		for entry in mounts_common + extra:
@@ -304,6 +1013,10 @@ class RunnerAbstract:
 			try:
 				os.lstat(entry.target)
 			except:
+				if not create:
+					raise Exception('%s does not exist, it is needed '
+							'as a mount point' % entry.target)
+
 				os.mkdir(entry.target, 755)
 
 			mount(entry.source, entry.target, entry.fstype, entry.flags,
@@ -312,6 +1025,10 @@ class RunnerAbstract:
 			mounted.append(entry.target)
 
 		for entry in dev_table:
+			# The host runner uses the hosts /dev which has these
+			if os.path.lexists(entry.linkpath):
+				continue
+
 			os.symlink(entry.target, entry.linkpath)
 
 		os.setsid()
@@ -351,6 +1068,54 @@ class RunnerAbstract:
 			if self.args.result_parent == '/tmp':
 				raise Exception('--result cannot be directly under /tmp')
 
+		if self.args.daemon:
+			if os.path.dirname(self.args.daemon) == '/tmp':
+				raise Exception('--daemon cannot be directly under /tmp')
+
+			os.makedirs(os.path.join(self.args.daemon, 'queue'), exist_ok=True)
+
+			for f in glob(os.path.join(self.args.daemon, 'queue', '*')) + \
+					glob(os.path.join(self.args.daemon, '*.*')):
+				os.remove(f)
+
+			# start() execs the runner so this remains the daemons PID
+			with open(os.path.join(self.args.daemon, 'pid'), 'w') as f:
+				f.write(str(os.getpid()))
+
+		if self.args.timings:
+			self.args.timings_parent = os.path.abspath(
+						os.path.join(self.args.timings, os.pardir))
+			if self.args.timings_parent == '/tmp':
+				raise Exception('--timings cannot be directly under /tmp')
+
+		if self.args.resources:
+			self.args.resources_parent = os.path.abspath(
+						os.path.join(self.args.resources, os.pardir))
+			if self.args.resources_parent == '/tmp':
+				raise Exception('--resources cannot be directly under /tmp')
+
+		if self.args.report:
+			self.args.report_parent = os.path.abspath(
+						os.path.join(self.args.report, os.pardir))
+			if self.args.report_parent == '/tmp':
+				raise Exception('--report cannot be directly under /tmp')
+
+		if self.args.bench_results:
+			self.args.bench_results_parent = os.path.abspath(
+					os.path.join(self.args.bench_results, os.pardir))
+			if self.args.bench_results_parent == '/tmp':
+				raise Exception('--bench-results cannot be directly under /tmp')
+
+		if self.args.gcov and self.args.coverage_map:
+			parent = os.path.abspath(os.path.join(self.args.coverage_map,
+								os.pardir))
+			if parent == '/tmp':
+				raise Exception('--coverage-map cannot be directly under /tmp')
+
+			# The test home is already writable
+			if not parent.startswith(os.path.abspath(self.args.testhome)):
+				self.args.coverage_map_parent = parent
+
 		if append_gid_uid:
 			self.args.SUDO_UID = uid
 			self.args.SUDO_GID = gid
@@ -415,10 +1180,11 @@ class QemuRunner(RunnerAbstract):
 			'-append',
 			'console=ttyS0,115200n8 earlyprintk=serial \
 				rootfstype=9p root=/dev/root \
-				rootflags=trans=virtio \
+				rootflags=%s \
 				acpi=off pci=noacpi %s ro \
 				mac80211_hwsim.radios=0 init=%s %s' %
-						(kern_log, self.init, args.to_cmd()),
+						(self._root_options(), kern_log,
+						self.init, args.to_cmd()),
 		]
 
 		# Add two ethernet devices for testing EAD
@@ -439,57 +1205,144 @@ class QemuRunner(RunnerAbstract):
 			for addr in pci_adapters:
 				qemu_cmdline.extend(['-device', 'vfio-pci,host=%s' % addr])
 
-		qemu_cmdline.extend([
-			'-virtfs',
-			'local,path=%s,%s' % (args.testhome, mount_options('homedir'))
-		])
-
-		if args.log:
+		if args.fs == 'virtiofs':
 			#
-			# Creates a virtfs device that can be mounted. This mount
-			# will point back to the provided log directory and is
-			# writable unlike the rest of the mounted file system.
+			# vhost-user devices require the guest memory to be shared
+			# with the virtiofsd processes.
 			#
 			qemu_cmdline.extend([
-				'-virtfs',
-				'local,path=%s,%s' % (args.log,
-							mount_options('logdir'))
+				'-object', 'memory-backend-memfd,id=mem,size=256M,share=on',
+				'-numa', 'node,memdev=mem'
 			])
 
-		if args.monitor:
-			qemu_cmdline.extend([
-				'-virtfs',
-				'local,path=%s,%s' % (self.args.monitor_parent,
-							mount_options('mondir'))
-			])
-
-		if args.result:
-			qemu_cmdline.extend([
-				'-virtfs',
-				'local,path=%s,%s' % (self.args.result_parent,
-							mount_options('resultdir'))
-			])
+			self.virtiofs_dir = tempfile.mkdtemp(prefix='virtiofs-')
 
+		#
+		# Each share is a device that can be mounted. These point back to
+		# a directory on the host and, apart from the test home, are
+		# writable unlike the rest of the mounted file system.
+		#
+		for tag, path in self._get_shares():
+			if args.fs == 'virtiofs':
+				sock = os.path.join(self.virtiofs_dir, tag)
+
+				qemu_cmdline.extend([
+					'-chardev', 'socket,id=%s,path=%s' % (tag, sock),
+					'-device', 'vhost-user-fs-pci,chardev=%s,tag=%s' %
+								(tag, tag)
+				])
+			else:
+				qemu_cmdline.extend([
+					'-virtfs',
+					'local,path=%s,%s' % (path, mount_options(tag))
+				])
 
 		self.cmdline = qemu_cmdline
 
-	def prepare_environment(self):
-		mounts = [ MountInfo('debugfs', 'debugfs', '/sys/kernel/debug', '', 0) ]
-
-		mounts.append(MountInfo('9p', 'homedir', self.args.testhome,
-					'trans=virtio,version=9p2000.L,msize=10240', 0))
+	def _get_shares(self):
+		shares = [('homedir', self.args.testhome)]
 
 		if self.args.log:
-			mounts.append(MountInfo('9p', 'logdir', self.args.log,
-					'trans=virtio,version=9p2000.L,msize=10240', 0))
+			shares.append(('logdir', self.args.log))
 
 		if self.args.monitor:
-			mounts.append(MountInfo('9p', 'mondir', self.args.monitor_parent,
-					'trans=virtio,version=9p2000.L,msize=10240', 0))
+			shares.append(('mondir', self.args.monitor_parent))
 
 		if self.args.result:
-			mounts.append(MountInfo('9p', 'resultdir', self.args.result_parent,
-					'trans=virtio,version=9p2000.L,msize=10240', 0))
+			shares.append(('resultdir', self.args.result_parent))
+
+		if self.args.timings:
+			shares.append(('timingsdir', self.args.timings_parent))
+
+		if self.args.resources:
+			shares.append(('resourcesdir', self.args.resources_parent))
+
+		if self.args.report:
+			shares.append(('reportdir', self.args.report_parent))
+
+		if self.args.coverage_map_parent:
+			shares.append(('coveragedir', self.args.coverage_map_parent))
+
+		if self.args.bench_results:
+			shares.append(('benchdir', self.args.bench_results_parent))
+
+		if self.args.job_dir:
+			shares.append(('jobdir', self.args.job_dir))
+
+		if self.args.daemon:
+			shares.append(('daemondir', self.args.daemon))
+
+		return shares
+
+	def _fs_transport(self):
+		if self.args.fs == 'virtiofs':
+			return 'virtiofs'
+
+		return '9p, %s' % self._9p_options()
+
+	def _root_options(self):
+		# Only override the kernel defaults for / if explicitly asked to
+		options = 'trans=virtio'
+
+		if self.args.fs_msize:
+			options += ',msize=%u' % self.args.fs_msize
+
+		if self.args.fs_cache:
+			options += ',cache=%s' % self.args.fs_cache
+
+		return options
+
+	def _9p_options(self):
+		return 'trans=virtio,version=9p2000.L,msize=%u,cache=%s' % \
+					(self.args.fs_msize or 10240,
+					self.args.fs_cache or 'none')
+
+	def _pre_start(self):
+		if self.args.fs != 'virtiofs':
+			return
+
+		virtiofsd = which('virtiofsd') or \
+				which('virtiofsd', path='/usr/libexec:/usr/lib/qemu')
+		if not virtiofsd:
+			raise Exception('Cannot locate virtiofsd binary')
+
+		if not self.args.fs_cache:
+			cache = 'auto'
+		elif self.args.fs_cache == 'none':
+			cache = 'never'
+		else:
+			cache = 'always'
+
+		#
+		# Each virtiofsd exits by itself once QEMU disconnects from its
+		# socket, i.e. when the VM shuts down.
+		#
+		for tag, path in self._get_shares():
+			sock = os.path.join(self.virtiofs_dir, tag)
+
+			subprocess.Popen([virtiofsd, '--socket-path=%s' % sock,
+						'--shared-dir=%s' % path,
+						'--cache=%s' % cache],
+						stdout=subprocess.DEVNULL,
+						stderr=subprocess.DEVNULL)
+
+			for i in range(50):
+				if os.path.exists(sock):
+					break
+
+				time.sleep(0.1)
+			else:
+				raise Exception('virtiofsd did not create %s' % sock)
+
+	def prepare_environment(self):
+		mounts = [ MountInfo('debugfs', 'debugfs', '/sys/kernel/debug', '', 0) ]
+
+		for tag, path in self._get_shares():
+			if self.args.fs == 'virtiofs':
+				mounts.append(MountInfo('virtiofs', tag, path, '', 0))
+			else:
+				mounts.append(MountInfo('9p', tag, path,
+							self._9p_options(), 0))
 
 		self._prepare_mounts(extra=mounts)
 
@@ -506,6 +1359,9 @@ class QemuRunner(RunnerAbstract):
 class UmlRunner(RunnerAbstract):
 	name = "UML Runner"
 
+	def _fs_transport(self):
+		return 'hostfs'
+
 	def __init__(self, args):
 		super().__init__(args)
 
@@ -519,8 +1375,18 @@ class UmlRunner(RunnerAbstract):
 
 		kern_log = "ignore_loglevel" if "kernel" in args.verbose else "quiet"
 
+		#
+		# eth0 and eth1 are connected to each other through a multicast
+		# group. Parallel jobs each need their own group (port) so that
+		# their ethernet traffic does not leak between instances.
+		#
+		if args.job_id is not None:
+			mcast = 'mcast,,239.192.168.1,%u,1' % (1102 + args.job_id)
+		else:
+			mcast = 'mcast'
+
 		cmd = [args.kernel, 'rootfstype=hostfs', 'ro', 'mem=256M', 'mac80211_hwsim.radios=0',
-				'time-travel=inf-cpu', 'eth0=mcast', 'eth1=mcast',
+				'time-travel=inf-cpu', 'eth0=%s' % mcast, 'eth1=%s' % mcast,
 				'%s' % kern_log, 'init=%s' % self.init]
 		cmd.extend(args.to_cmd().split(' '))
 
@@ -541,6 +1407,36 @@ class UmlRunner(RunnerAbstract):
 			mounts.append(MountInfo('hostfs', 'hostfs', self.args.result_parent,
 						self.args.result_parent, 0))
 
+		if self.args.timings:
+			mounts.append(MountInfo('hostfs', 'hostfs', self.args.timings_parent,
+						self.args.timings_parent, 0))
+
+		if self.args.resources:
+			mounts.append(MountInfo('hostfs', 'hostfs', self.args.resources_parent,
+						self.args.resources_parent, 0))
+
+		if self.args.report:
+			mounts.append(MountInfo('hostfs', 'hostfs', self.args.report_parent,
+						self.args.report_parent, 0))
+
+		if self.args.coverage_map_parent:
+			mounts.append(MountInfo('hostfs', 'hostfs',
+						self.args.coverage_map_parent,
+						self.args.coverage_map_parent, 0))
+
+		if self.args.bench_results:
+			mounts.append(MountInfo('hostfs', 'hostfs',
+						self.args.bench_results_parent,
+						self.args.bench_results_parent, 0))
+
+		if self.args.job_dir:
+			mounts.append(MountInfo('hostfs', 'hostfs', self.args.job_dir,
+						self.args.job_dir, 0))
+
+		if self.args.daemon:
+			mounts.append(MountInfo('hostfs', 'hostfs', self.args.daemon,
+						self.args.daemon, 0))
+
 		mounts.append(MountInfo('hostfs', 'hostfs', self.args.testhome,
 					self.args.testhome, 0))
 
@@ -555,3 +1451,320 @@ class UmlRunner(RunnerAbstract):
 		# exit is achieved with RB_POWER_OFF
 		#
 		libc.reboot(RB_POWER_OFF)
+
+#
+# Runs several instances of a runner in parallel. Each instance (job) is given
+# a shared, writable job directory which acts as the test queue: a job claims
+# a test by creating <job_dir>/<test> (mkdir is atomic on the host) and stores
+# the result of that test there once it has finished. After all jobs exit the
+# results are merged into a single table and --result file.
+#
+class RunnerPool:
+	name = "Runner Pool"
+
+	def __init__(self, args, runner):
+		self.args = args
+		self.runners = []
+
+		if args.start or args.gdb:
+			raise Exception('--jobs cannot be used with --start or --gdb')
+
+		if args.unit_tests:
+			raise Exception('--jobs is only supported for autotests')
+
+		self.job_dir = tempfile.mkdtemp(prefix='test-runner-', dir='/var/tmp')
+
+		for i in range(1, args.jobs + 1):
+			job_args = pycopy.copy(args)
+			job_args.job_dir = self.job_dir
+			job_args.job_id = i
+			# Each job runs a single test environment of its own
+			job_args.jobs = 1
+			# Results are collected by the pool, not by each job
+			job_args.result = None
+
+			if args.monitor:
+				job_args.monitor = '%s.%u' % (args.monitor, i)
+
+			# Merged into --report by the pool once all jobs are done
+			if args.report:
+				job_args.report = '%s.%u' % (args.report, i)
+				job_args.report_format = 'jsonl'
+
+			# Merged into --coverage-map by the pool as well
+			if args.gcov:
+				job_args.coverage_map_job = '%s.%u' % (args.coverage_map, i)
+
+			self.runners.append(runner(job_args))
+
+		if args.log:
+			self.runners[0]._clear_logs()
+
+	def _relay_output(self, job_id, proc):
+		for line in iter(proc.stdout.readline, b''):
+			sys.stdout.write('[%u] %s' % (job_id, line.decode('utf-8',
+							errors='replace')))
+			sys.stdout.flush()
+
+	def _collect_results(self):
+		results = {}
+
+		for test in sorted(os.listdir(self.job_dir)):
+			path = os.path.join(self.job_dir, test, 'result')
+
+			try:
+				with open(path, 'r') as f:
+					results[test] = SimpleResult(**json.load(f))
+			except:
+				# Test was claimed but the job died before finishing
+				results[test] = SimpleResult(run=0, failures=0,
+						errors=0, skipped=0, time=0)
+
+		return results
+
+	def start(self):
+		print("Starting %s (%u %s jobs)" % (self.name, len(self.runners),
+							self.runners[0].name))
+
+		procs = []
+		threads = []
+
+		for r in self.runners:
+			r._pre_start()
+
+			p = subprocess.Popen(r.cmdline, env=r.env, stdin=subprocess.DEVNULL,
+						stdout=subprocess.PIPE,
+						stderr=subprocess.STDOUT)
+			t = threading.Thread(target=self._relay_output,
+						args=(r.args.job_id, p))
+			t.start()
+
+			procs.append(p)
+			threads.append(t)
+
+		for p, t in zip(procs, threads):
+			p.wait()
+			t.join()
+
+		results = self._collect_results()
+
+		if self.args.report:
+			report = ResultReport(self.args.report, self.args.report_format)
+
+			for r in self.runners:
+				try:
+					report.extend(ResultReport.read(r.args.report))
+					os.remove(r.args.report)
+				except FileNotFoundError:
+					pass
+
+		if self.args.gcov:
+			coverage = CoverageMap(self.args.coverage_map)
+
+			for r in self.runners:
+				if os.path.exists(r.args.coverage_map_job):
+					coverage.merge(CoverageMap(r.args.coverage_map_job))
+					os.remove(r.args.coverage_map_job)
+
+			coverage.save()
+
+		if results:
+			success = print_results(results)
+		else:
+			# With --changed-since there may be nothing to run
+			success = bool(self.args.changed_since)
+
+		if self.args.result:
+			with open(self.args.result, 'w') as f:
+				f.write('PASS' if success else 'FAIL')
+
+		if self.args.timings:
+			timings = TimingDatabase(self.args.timings)
+			timings.update(results)
+			timings.save()
+
+		rmtree(self.job_dir)
+
+		sys.exit(0 if success else 1)
+
+#
+# Submits tests to a test environment which was started with --daemon. Requests
+# are JSON files placed in <daemon>/queue. The test environment writes all
+# output for a request to <daemon>/<request>.out, which is streamed to stdout,
+# and the results to <daemon>/<request>.result once all tests have finished.
+#
+class DaemonClient:
+	name = "Daemon Client"
+
+	def __init__(self, args):
+		self.args = args
+		self.request = '%.6f.%u' % (time.time(), os.getpid())
+
+	@staticmethod
+	def _get_pid(daemon):
+		try:
+			with open(os.path.join(daemon, 'pid'), 'r') as f:
+				return int(f.read())
+		except:
+			return None
+
+	@staticmethod
+	def is_running(daemon):
+		pid = DaemonClient._get_pid(daemon)
+		if not pid:
+			return False
+
+		try:
+			os.kill(pid, 0)
+		except OSError:
+			return False
+
+		return True
+
+	def _submit(self, request):
+		queue = os.path.join(self.args.daemon, 'queue')
+		tmp = os.path.join(self.args.daemon, self.request + '.tmp')
+
+		with open(tmp, 'w') as f:
+			json.dump(request, f)
+
+		# Rename so the test environment never sees a partial request
+		os.rename(tmp, os.path.join(queue, self.request))
+
+	def start(self):
+		if self.args.daemon_stop:
+			self._submit({ 'stop': True })
+			return
+
+		self._submit({ 'autotests': self.args.autotests,
+				'sub_tests': self.args.sub_tests })
+
+		out = os.path.join(self.args.daemon, self.request + '.out')
+		result = os.path.join(self.args.daemon, self.request + '.result')
+		pos = 0
+
+		while True:
+			# Check for the result before the final read of the output
+			done = os.path.exists(result)
+
+			if os.path.exists(out):
+				with open(out, 'r') as f:
+					f.seek(pos)
+					data = f.read()
+					pos = f.tell()
+
+				sys.stdout.write(data)
+				sys.stdout.flush()
+
+			if done:
+				break
+
+			if not self.is_running(self.args.daemon):
+				raise Exception("Test environment in %s exited" %
+							self.args.daemon)
+
+			time.sleep(0.1)
+
+		with open(result, 'r') as f:
+			results = { k: SimpleResult(**v) for k, v in json.load(f).items() }
+
+		os.remove(out)
+		os.remove(result)
+
+		success = print_results(results) if results else False
+
+		if self.args.result:
+			with open(self.args.result, 'w') as f:
+				f.write('PASS' if success else 'FAIL')
+
+		sys.exit(0 if success else 1)
+
+#
+# Runs the tests directly on the host kernel. The test process is started in a
+# new user, mount, network and PID namespace (as root within the user namespace)
+# so it gets its own /tmp, /etc, /run etc. and can create mac80211_hwsim radios
+# without affecting the host.
+#
+class HostRunner(RunnerAbstract):
+	name = "Host Runner"
+
+	def __init__(self, args):
+		super().__init__(args)
+
+		if len(sys.argv) <= 1:
+			return
+
+		if args.hw:
+			raise Exception('--hw is not supported by the host runner')
+
+		if not which('unshare'):
+			raise Exception('Cannot locate unshare binary')
+
+		if not os.path.exists('/sys/module/mac80211_hwsim'):
+			if os.system('modprobe mac80211_hwsim radios=0') != 0:
+				raise Exception('mac80211_hwsim is not loaded and '
+						'could not be loaded')
+
+		self._prepare_outfiles()
+
+		#
+		# Everything is created by root inside the user namespace which
+		# maps to the user running test-runner, chown'ing to SUDO_UID
+		# is neither needed nor possible.
+		#
+		self.args.SUDO_UID = None
+		self.args.SUDO_GID = None
+
+		self.cmdline = ['unshare', '--user', '--map-root-user', '--mount',
+				'--propagation', 'private', '--net', '--pid',
+				'--fork', self.init]
+
+		self.env = args.to_env()
+		self.env['TERM'] = os.environ.get('TERM', 'linux')
+
+	def _fs_transport(self):
+		return 'host'
+
+	#
+	# The test home and the output directories which the tmpfs mounts over
+	# /tmp, /run and /etc would hide, i.e. those the VM runners share with
+	# the guest.
+	#
+	def _hidden_dirs(self):
+		masked = [m.target for m in mounts_common if m.fstype == 'tmpfs']
+		dirs = [self.args.testhome, self.args.log, self.args.daemon,
+				self.args.job_dir]
+		dirs += [v for k, v in vars(self.args).items()
+				if k.endswith('_parent')]
+
+		dirs = [os.path.abspath(d) for d in dirs if d and os.path.isdir(d)]
+
+		return sorted(set([d for d in dirs for m in masked
+					if d.startswith(m + '/')]))
+
+	def prepare_environment(self):
+		#
+		# Keep the hidden directories reachable through O_PATH descriptors
+		# and bind mount them back on top of the new tmpfs mounts.
+		#
+		hidden = [(d, os.open(d, os.O_PATH)) for d in self._hidden_dirs()]
+
+		self._prepare_mounts(create=False)
+
+		for d, fd in hidden:
+			# Inside the tmpfs, not on the host
+			os.makedirs(d, exist_ok=True)
+			mount('/proc/self/fd/%u' % fd, d, 'none', MS_BIND)
+			os.close(fd)
+
+		super().prepare_environment()
+
+		# Emulate the two connected ethernet devices of the VM runners
+		os.system('ip link add eth0 type veth peer name eth1')
+
+	def stop(self):
+		#
+		# Exiting the first process of the PID namespace takes down
+		# every process started by the tests with it.
+		#
+		os._exit(0)
@@ -4,33 +4,99 @@ import fcntl
 import sys
 import traceback
 import shutil
+import codecs
+import builtins
+import importlib
 import dbus
 
-from gi.repository import GLib
+from gi.repository import GLib, Gio
 from weakref import WeakValueDictionary
 from re import fullmatch
-from time import sleep
+from time import monotonic, sleep
 
 from runner import RunnerCoreArgParse
 
+class OutputBuffer:
+	'''
+		Ring buffer keeping the last 'size' bytes of a process' output, or
+		all of it if 'size' is None. Deleting from the front of a bytearray
+		does not move the remaining data so appending stays cheap.
+	'''
+	def __init__(self, size):
+		self.size = size
+		self.data = bytearray()
+
+	def append(self, data):
+		self.data += data
+
+		if self.size is not None and len(self.data) > self.size:
+			del self.data[:len(self.data) - self.size]
+
+	def __str__(self):
+		return self.data.decode('utf-8', errors='replace')
+
+class LogWriter:
+	'''
+		Writes process output to the log files, which are flushed
+		periodically rather than after every chunk written.
+	'''
+	def __init__(self, interval=500):
+		self.interval = interval
+		self.dirty = set()
+		self.timeout = None
+
+	def write(self, f, data):
+		f.write(data)
+		self.dirty.add(f)
+
+		if not self.timeout:
+			self.timeout = GLib.timeout_add(self.interval, self._flush_cb)
+
+	def _flush_cb(self):
+		self.timeout = None
+		self.flush()
+
+		return False
+
+	def flush(self):
+		for f in self.dirty:
+			try:
+				f.flush()
+			except ValueError:
+				# Already closed
+				pass
+
+		self.dirty = set()
+
 class Process(subprocess.Popen):
 	processes = WeakValueDictionary()
 	testargs = RunnerCoreArgParse().parse_args()
+	log_writer = LogWriter()
+	# Usage of the processes reaped since usage_start()
+	finished = []
 
 	def __new__(cls, *args, **kwargs):
 		obj = super().__new__(cls)
 		cls.processes[id(obj)] = obj
 		return obj
 
-	def __init__(self, args, namespace=None, outfile=None, env=None, check=False, cleanup=None):
+	def __init__(self, args, namespace=None, outfile=None, env=None, check=False,
+			cleanup=None, persist=False, out_size=64 * 1024):
 		self.write_fds = []
 		self.io_watch = None
 		self.cleanup = cleanup
+		# Persistent processes survive kill_all() between tests
+		self.persist = persist
 		self.verbose = False
-		self.out = ''
+		# Only the last 'out_size' bytes are kept, None keeps everything
+		self._out = OutputBuffer(out_size)
+		self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
 		self.hup = False
 		self.killed = False
 		self.namespace = namespace
+		self.rusage = None
+		self.start_time = monotonic()
+		self.end_time = None
 
 		logfile = args[0]
 
@@ -114,22 +180,153 @@ class Process(subprocess.Popen):
 	@classmethod
 	def kill_all(cls):
 		for p in cls.processes.values():
-			if p.args[0] == 'dmesg':
+			if p.args[0] == 'dmesg' or p.persist:
 				continue
 
 			p.kill()
 
+	@property
+	def out(self):
+		return str(self._out)
+
+	@property
+	def name(self):
+		# Namespace processes are started by 'ip netns exec <ns>'
+		return os.path.basename(self.args[4 if self.namespace else 0])
+
+	#
+	# Reaps the process with wait4() to keep its rusage. Popen's own wait()
+	# and poll() then only return the returncode set here. Like Popen.wait()
+	# this polls until 'timeout' (seconds) as there is no wait4() timeout.
+	#
+	def _reap(self, timeout=0):
+		deadline = monotonic() + timeout
+		delay = 0.0005
+
+		while self.returncode is None:
+			try:
+				pid, status, rusage = os.wait4(self.pid, os.WNOHANG)
+			except ChildProcessError:
+				# Reaped elsewhere, the exit status is lost
+				self.returncode = 0
+				break
+
+			if pid == self.pid:
+				self.rusage = rusage
+				self.end_time = monotonic()
+				self.returncode = os.waitstatus_to_exitcode(status)
+				Process.finished.append(self.usage())
+				break
+
+			remaining = deadline - monotonic()
+			if remaining <= 0:
+				break
+
+			delay = min(delay * 2, remaining, 0.05)
+			sleep(delay)
+
+	def poll(self):
+		self._reap()
+
+		return super().poll()
+
+	def usage(self):
+		'''
+			Returns the CPU time (seconds), peak RSS (kB), voluntary and
+			involuntary context switches and run time of the process.
+			These come from the rusage once the process was reaped and
+			from /proc while it is running. Returns None if neither is
+			available, e.g. for a process started by another process.
+		'''
+		ret = {
+			'name': self.name,
+			'namespace': self.namespace,
+			'pid': self.pid,
+			'runtime': (self.end_time or monotonic()) - self.start_time
+		}
+
+		if self.rusage:
+			ret['user'] = self.rusage.ru_utime
+			ret['system'] = self.rusage.ru_stime
+			ret['maxrss'] = self.rusage.ru_maxrss
+			ret['vcsw'] = self.rusage.ru_nvcsw
+			ret['ivcsw'] = self.rusage.ru_nivcsw
+
+			return ret
+
+		try:
+			with open('/proc/%u/stat' % self.pid) as f:
+				# Skip over the command, which may contain spaces
+				stat = f.read().rsplit(')', 1)[1].split()
+
+			with open('/proc/%u/status' % self.pid) as f:
+				status = dict([l.split(':', 1) for l in f.read().splitlines()])
+		except (OSError, IndexError):
+			return None
+
+		# utime and stime are the 14th and 15th field
+		ret['user'] = int(stat[11]) / os.sysconf('SC_CLK_TCK')
+		ret['system'] = int(stat[12]) / os.sysconf('SC_CLK_TCK')
+		# Not present for zombies
+		ret['maxrss'] = int(status.get('VmHWM', '0').split()[0])
+		ret['vcsw'] = int(status['voluntary_ctxt_switches'])
+		ret['ivcsw'] = int(status['nonvoluntary_ctxt_switches'])
+
+		return ret
+
+	@classmethod
+	def usage_start(cls):
+		'''
+			Starts a new accounting period, returns the current usage of
+			all running processes to be passed to usage_since().
+		'''
+		cls.finished = []
+
+		usage = [p.usage() for p in cls.processes.values() if not p.rusage]
+
+		return {u['pid']: u for u in usage if u}
+
+	@classmethod
+	def usage_since(cls, start):
+		'''
+			Returns the usage of every process since usage_start() returned
+			'start', including the processes reaped since then. The peak
+			RSS is the peak over the lifetime of the process.
+		'''
+		usage = [dict(u) for u in cls.finished]
+		reaped = [u['pid'] for u in usage]
+
+		for p in list(cls.processes.values()):
+			if p.rusage or p.pid in reaped:
+				continue
+
+			u = p.usage()
+			if u:
+				usage.append(u)
+
+		for u in usage:
+			old = start.get(u['pid'])
+			if not old:
+				continue
+
+			for key in ['user', 'system', 'vcsw', 'ivcsw', 'runtime']:
+				u[key] -= old[key]
+
+		for u in usage:
+			for key in ['user', 'system', 'runtime']:
+				u[key] = round(u[key], 3)
+
+		return usage
+
 	@staticmethod
 	def _write_io(instance, data, stdout=True):
 		for f in instance.write_fds:
-			f.write(data)
+			Process.log_writer.write(f, data)
 
 			# Write out a separator so multiple process calls per
 			# test are easer to read.
 			if instance.hup:
-				f.write("Terminated: {}\n\n".format(instance.args))
-
-			f.flush()
+				Process.log_writer.write(f, "Terminated: {}\n\n".format(instance.args))
 
 		if instance.verbose and stdout:
 			sys.__stdout__.write(data)
@@ -146,6 +343,9 @@ class Process(subprocess.Popen):
 		#
 		nowrite = []
 
+		# Pending output must be written before the separators
+		cls.log_writer.flush()
+
 		for proc in cls.processes.values():
 			if proc.killed:
 				continue
@@ -173,13 +373,12 @@ class Process(subprocess.Popen):
 		if not data:
 			return True
 
-		try:
-			data = data.decode('utf-8')
-		except:
-			return True
+		# Save data away in case the caller needs it (e.g. 'iw dev')
+		self._out.append(data)
 
-		# Save data away in case the caller needs it (e.g. list_sta)
-		self.out += data
+		data = self._decoder.decode(data)
+		if not data:
+			return True
 
 		self._write_io(self, data)
 
@@ -214,35 +413,82 @@ class Process(subprocess.Popen):
 		self.write_fds.append(f)
 
 	def wait_for_socket(self, socket, wait):
+		'''
+			Waits for 'socket' to be created. The closest existing parent
+			directory is watched with inotify (through GIO) so the path
+			is only checked again once something in it has changed.
+		'''
+		monitor = None
+		watched = None
+
+		def _changed(*args):
+			# Only needed to wake up the main loop
+			pass
+
 		def _wait(socket):
-			if not os.path.exists(socket):
-				sleep(0.1)
+			nonlocal monitor, watched
+
+			if os.path.exists(socket):
+				return True
+
+			dir = os.path.dirname(socket)
+			while not os.path.isdir(dir):
+				dir = os.path.dirname(dir)
+
+			if dir == watched:
 				return False
-			return True
 
-		Namespace.non_block_wait(_wait, wait, socket,
+			if monitor:
+				monitor.cancel()
+
+			monitor = Gio.File.new_for_path(dir).monitor_directory(
+						Gio.FileMonitorFlags.NONE, None)
+			monitor.connect('changed', _changed)
+			watched = dir
+
+			# Created before the watch was added?
+			return os.path.exists(socket)
+
+		try:
+			Namespace.non_block_wait(_wait, wait, socket,
 				exception=Exception("Timed out waiting for %s" % socket))
+		finally:
+			if monitor:
+				monitor.cancel()
 
 	def wait_for_service(self, ns, service, wait):
-		def _wait(ns, service):
-			if not ns._bus.name_has_owner(service):
-				sleep(0.1)
-				return False
-			return True
+		'''
+			Waits for 'service' to appear on the bus of 'ns', using the
+			NameOwnerChanged signal rather than polling the bus.
+		'''
+		owned = False
 
-		Namespace.non_block_wait(_wait, wait, ns, service,
+		def _owner_changed(name, old_owner, new_owner):
+			nonlocal owned
+
+			if new_owner:
+				owned = True
+
+		match = ns._bus.add_signal_receiver(_owner_changed,
+					signal_name='NameOwnerChanged',
+					dbus_interface='org.freedesktop.DBus',
+					bus_name='org.freedesktop.DBus',
+					arg0=service)
+
+		try:
+			# Subscribed first so the name can't appear unnoticed
+			owned = ns._bus.name_has_owner(service)
+
+			Namespace.non_block_wait(lambda: owned, wait,
 				exception=Exception("Timed out waiting for %s" % service))
+		finally:
+			match.remove()
 
 	# Wait for both process termination and HUP signal
 	def __wait(self, timeout):
-		try:
-			super().wait(timeout)
-			if not self.hup:
-				return False
+		self._reap(timeout)
 
-			return True
-		except:
-			return False
+		return self.returncode is not None and self.hup
 
 	# Override wait() so it can do so non-blocking
 	def wait(self, timeout=10):
@@ -315,9 +561,96 @@ busconfig.dtd\">
 </policy>
 '''
 
+class WaitStats:
+	'''
+		Counters for Namespace.non_block_wait()
+	'''
+	def __init__(self):
+		self.reset()
+
+	def reset(self):
+		self.waits = 0
+		self.iterations = 0
+		self.total = 0
+		self.longest = 0
+
+	def add(self, duration, iterations):
+		self.waits += 1
+		self.iterations += iterations
+		self.total += duration
+		self.longest = max(self.longest, duration)
+
+	def __str__(self):
+		if not self.waits:
+			return '0'
+
+		return '%u (%.3f sec total, %.3f sec average, %.3f sec longest, ' \
+			'%u iterations)' % (self.waits, self.total,
+			self.total / self.waits, self.longest, self.iterations)
+
+class ImportTimer:
+	'''
+		Records the time spent importing each module once started. Like
+		the 'self' column of python -X importtime a module is only charged
+		for its own code, not for the modules it imports. Modules which
+		were already loaded are not timed.
+	'''
+	def __init__(self):
+		self.times = {}
+		self._stack = []
+		self._import = None
+
+	def start(self):
+		self._import = builtins.__import__
+		builtins.__import__ = self._timed_import
+
+	def reset(self):
+		self.times = {}
+
+	def _timed(self, func, name, *args, **kwargs):
+		if not name or name in sys.modules:
+			return func(name, *args, **kwargs)
+
+		self._stack.append(0)
+		start = monotonic()
+
+		try:
+			return func(name, *args, **kwargs)
+		finally:
+			elapsed = monotonic() - start
+			nested = self._stack.pop()
+
+			self.times[name] = self.times.get(name, 0) + elapsed - nested
+
+			if self._stack:
+				self._stack[-1] += elapsed
+
+	def _timed_import(self, name, *args, **kwargs):
+		return self._timed(self._import, name, *args, **kwargs)
+
+	def import_module(self, name):
+		return self._timed(importlib.import_module, name)
+
+	def total(self):
+		return sum(self.times.values())
+
+	def slowest(self, count=10):
+		return sorted(self.times.items(), key=lambda i: i[1],
+				reverse=True)[:count]
+
 class Namespace:
+	# All waits iterate the default context, see non_block_wait()
+	_context = GLib.MainContext.default()
+	wait_stats = WaitStats()
+	# Number of non_block_wait() calls in progress
+	wait_depth = 0
+	# Set by the test function watchdog in run-tests while waiting, see
+	# non_block_wait()
+	watchdog_expired = False
+
 	def __init__(self, args, name, radios):
 		self.dbus_address = None
+		self.dbus_proc = None
 		self.name = name
 		self.radios = radios
 		self.args = args
@@ -329,7 +662,8 @@ class Namespace:
 		self.start_dbus()
 
 	def reset(self):
-		self._bus = None
+		if not self.dbus_proc or not self.dbus_proc.persist:
+			self._bus = None
 
 		for r in self.radios:
 			r._radio = None
@@ -388,9 +722,13 @@ class Namespace:
 
 		os.remove(self.dbus_cfg)
 
-	def start_dbus(self):
+	def start_dbus(self, persist=False):
 		global dbus_count
 
+		# A persistent dbus-daemon is still running from a previous test
+		if self.dbus_proc and self.dbus_proc.persist and not self.dbus_proc.killed:
+			return
+
 		self.dbus_address = 'unix:path=/tmp/dbus%d' % dbus_count
 		self.dbus_cfg = '/tmp/dbus%d.conf' % dbus_count
 		dbus_count += 1
@@ -401,7 +739,8 @@ class Namespace:
 			f.write('</busconfig>\n')
 
 		p = self.start_process(['dbus-daemon', '--config-file=%s' % self.dbus_cfg],
-					cleanup=self._cleanup_dbus)
+					cleanup=self._cleanup_dbus, persist=persist)
+		self.dbus_proc = p
 
 		p.wait_for_socket(self.dbus_address.split('=')[1], 5)
 
@@ -458,7 +797,8 @@ class Namespace:
 			either it returns success, throws an exception, or the
 			'timeout' expires.
 
-			'timeout' is the ultimate timeout in seconds
+			'timeout' is the ultimate timeout in seconds, fractions of
+			a second are allowed.
 
 			'*args' will be passed to 'func'
 
@@ -466,42 +806,59 @@ class Namespace:
 			If 'exception' is True a generic TimeoutError will be raised.
 			Any other value will not result in an exception.
 		'''
-		# Simple class for signaling the wait timeout
-		class Bool:
-			def __init__(self, value):
-				self.value = value
-
-		def wait_timeout_cb(done):
-			done.value = True
+		start = monotonic()
+		deadline = start + timeout
+		timer = None
+		iterations = 0
+
+		def wait_timeout_cb():
+			nonlocal timer
+			timer = None
 			return False
 
-		mainloop = GLib.MainLoop()
-		done = Bool(False)
+		Namespace.wait_depth += 1
 
-		timeout = GLib.timeout_add_seconds(timeout, wait_timeout_cb, done)
-		context = mainloop.get_context()
+		try:
+			while True:
+				#
+				# An exception raised by a signal handler while
+				# GLib dispatches a callback gets swallowed by
+				# PyGObject, so the watchdog only sets this flag
+				# during a wait.
+				#
+				if Namespace.watchdog_expired:
+					Namespace.watchdog_expired = False
+					raise TimeoutError("Test function did not "
+								"finish in time")
 
-		while True:
-			try:
 				ret = func(*args)
 				if ret:
-					if not done.value:
-						GLib.source_remove(timeout)
 					return ret
-			except Exception as e:
-				if not done.value:
-					GLib.source_remove(timeout)
-				raise e
-
-			if done.value == True:
-				if isinstance(exception, Exception):
-					raise exception
-				elif type(exception) == bool and exception:
-					raise TimeoutError("Timeout on non_block_wait")
-				else:
-					return
-
-			context.iteration(may_block=True)
+
+				now = monotonic()
+				if now >= deadline:
+					break
+
+				# The timer only exists to wake up the iteration below,
+				# so only add one when there is nothing else to do.
+				if not timer and not Namespace._context.pending():
+					ms = int((deadline - now) * 1000) + 1
+					timer = GLib.timeout_add(ms, wait_timeout_cb)
+
+				Namespace._context.iteration(may_block=True)
+				iterations += 1
+		finally:
+			Namespace.wait_depth -= 1
+
+			if timer:
+				GLib.source_remove(timer)
+
+			Namespace.wait_stats.add(monotonic() - start, iterations)
+
+		if isinstance(exception, Exception):
+			raise exception
+		elif type(exception) == bool and exception:
+			raise TimeoutError("Timeout on non_block_wait")
 
 	def __str__(self):
 		ret = 'Namespace: %s\n' % self.name